@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""
+RunDown benchmarks - times run processing, image layout and encoding, the
+end-to-end CLI flow against a stubbed Strava client, and CLI import time.
+
+Results are written as JSON so runs from different versions can be compared:
+
+    python benchmarks/run_benchmarks.py --volumes week,year,10y -o bench.json
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+from benchmarks.synthetic import VOLUMES, StubClient, synthetic_activities  # noqa: E402
+
+
+def time_calls(fn, repeat):
+    """Call fn repeat times and summarise the wall times in milliseconds."""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - start) * 1000)
+    return {
+        "runs": repeat,
+        "min_ms": round(min(times), 3),
+        "median_ms": round(statistics.median(times), 3),
+        "mean_ms": round(statistics.fmean(times), 3),
+    }
+
+
+def bench_process(activities, repeat):
+    from src.run_data_processor import RunDataProcessor, process_run_stream
+
+    runs = [a for a in activities if a.type == 'Run']
+    return {
+        "process_runs": time_calls(lambda: RunDataProcessor(runs).process_runs(), repeat),
+        "process_run_stream": time_calls(lambda: process_run_stream(activities).result(), repeat),
+    }
+
+
+def bench_render(activities, repeat, tmpdir):
+    from src.generate_image import ENCODER_PRESETS, StravaStatsImage
+    from src.run_data_processor import process_run_stream
+
+    data = process_run_stream(activities).result()
+    results = {}
+
+    def layout():
+        StravaStatsImage(data, os.path.join(tmpdir, "bench.png"), "Mar 11 - Mar 17, 2024").render()
+
+    results["layout"] = time_calls(layout, repeat)
+
+    for name, encoder in ENCODER_PRESETS.items():
+        image = StravaStatsImage(data, os.path.join(tmpdir, f"bench.{encoder.extension}"),
+                                 "Mar 11 - Mar 17, 2024", encoder=encoder)
+        image.render()
+        results[f"encode_{name}"] = time_calls(image.save, repeat)
+        results[f"encode_{name}"]["bytes"] = os.path.getsize(image.output_path)
+
+    return results
+
+
+def bench_main(activities, repeat, tmpdir):
+    import src.auth
+    from src.main import main
+
+    start = activities[0].start_date.strftime('%Y-%m-%d')
+    end = activities[-1].start_date.strftime('%Y-%m-%d')
+    client = StubClient(activities)
+    cache = os.path.join(tmpdir, "activities.db")
+    render_cache = os.path.join(tmpdir, "render_cache")
+    base_args = ["rundown", "--start", start, "--end", end, "--cache", cache]
+
+    def run(extra_args):
+        sys.argv = base_args + extra_args
+        with contextlib.redirect_stdout(io.StringIO()):
+            try:
+                main()
+            except SystemExit:
+                pass
+
+    original = src.auth.authenticate_strava
+    src.auth.authenticate_strava = lambda: client
+    try:
+        results = {
+            "main_no_cache": time_calls(
+                lambda: run(["--no-cache", "--no-render-cache", "-o", os.path.join(tmpdir, "e2e.png")]),
+                repeat
+            ),
+        }
+        if os.path.exists(cache):
+            os.remove(cache)
+        run(["-f", "json", "-o", os.path.join(tmpdir, "warm.json")])  # Populate the store
+        results["main_cached"] = time_calls(
+            lambda: run(["--no-render-cache", "-o", os.path.join(tmpdir, "e2e.png")]), repeat
+        )
+        render_args = ["--render-cache", render_cache, "-o", os.path.join(tmpdir, "e2e.png")]
+        run(render_args)  # Populate the render cache
+        results["main_render_cache_hit"] = time_calls(lambda: run(render_args), repeat)
+        results["main_cached_json"] = time_calls(
+            lambda: run(["-f", "json", "-o", os.path.join(tmpdir, "e2e.json")]), repeat
+        )
+    finally:
+        src.auth.authenticate_strava = original
+    return results
+
+
+def bench_import(repeat):
+    """Time importing the CLI module in a fresh interpreter."""
+    code = ("import time; t = time.perf_counter(); import src.main; "
+            "print((time.perf_counter() - t) * 1000)")
+    times = [
+        float(subprocess.run([sys.executable, "-c", code], cwd=REPO_ROOT, check=True,
+                             capture_output=True, text=True).stdout)
+        for _ in range(repeat)
+    ]
+    return {"runs": repeat, "min_ms": round(min(times), 3),
+            "median_ms": round(statistics.median(times), 3)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run RunDown benchmarks")
+    parser.add_argument(
+        '--volumes',
+        default="week,year",
+        help=f"Comma-separated history sizes: {', '.join(VOLUMES)} (default: week,year)"
+    )
+    parser.add_argument('--repeat', type=int, default=5, help='Repetitions per benchmark (default: 5)')
+    parser.add_argument('--output', '-o', help='JSON results file (default: stdout)')
+    parser.add_argument(
+        '--import-budget-ms',
+        type=float,
+        default=100.0,
+        help='Fail if importing src.main takes longer than this (default: 100)'
+    )
+    args = parser.parse_args()
+
+    volumes = [v.strip() for v in args.volumes.split(",") if v.strip()]
+    unknown = [v for v in volumes if v not in VOLUMES]
+    if unknown:
+        parser.error(f"Unknown volume(s): {', '.join(unknown)}")
+
+    report = {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "repeat": args.repeat,
+        },
+        "import": bench_import(args.repeat),
+        "volumes": {},
+    }
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        for volume in volumes:
+            activities = synthetic_activities(VOLUMES[volume])
+            print(f"Benchmarking {volume} ({len(activities)} activities)...", file=sys.stderr)
+            report["volumes"][volume] = {
+                "activities": len(activities),
+                "process": bench_process(activities, args.repeat),
+                "render": bench_render(activities, args.repeat, tmpdir),
+                "main": bench_main(activities, args.repeat, tmpdir),
+            }
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+
+    import_ms = report["import"]["median_ms"]
+    if import_ms > args.import_budget_ms:
+        print(f"Import time {import_ms:.1f} ms exceeds the {args.import_budget_ms:.0f} ms budget",
+              file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
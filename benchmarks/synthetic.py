@@ -0,0 +1,70 @@
+"""
+Synthetic activity generator for RunDown benchmarks.
+"""
+
+import random
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional
+
+from src.run_record import RunRecord
+
+# Named history sizes in days
+VOLUMES = {
+    "week": 7,
+    "month": 30,
+    "year": 365,
+    "10y": 3650,
+}
+
+
+def synthetic_activities(days: int, activities_per_day: float = 0.8, run_share: float = 0.85,
+                         end: Optional[datetime] = None, seed: int = 0) -> List[RunRecord]:
+    """
+    Generate a reproducible activity history ending at ``end``.
+
+    Args:
+        days: Length of the history in days
+        activities_per_day: Average number of activities per day
+        run_share: Fraction of activities that are runs (the rest are rides)
+        end: End of the history (default: 2024-12-31 UTC)
+        seed: Random seed
+
+    Returns:
+        Activities ordered by start date
+    """
+    rng = random.Random(seed)
+    end = end or datetime(2024, 12, 31, 23, 59, tzinfo=timezone.utc)
+    start = end - timedelta(days=days)
+    count = int(days * activities_per_day)
+
+    activities = []
+    for i in range(count):
+        start_date = start + timedelta(seconds=rng.uniform(0, days * 86400))
+        is_run = rng.random() < run_share
+        distance = rng.uniform(3000, 42195) if is_run else rng.uniform(10000, 120000)
+        pace = rng.uniform(220, 420) if is_run else rng.uniform(90, 180)  # Seconds per km
+        activities.append(RunRecord(
+            id=i + 1,
+            name=f"{'Run' if is_run else 'Ride'} {i + 1}",
+            type="Run" if is_run else "Ride",
+            distance=round(distance, 1),
+            moving_time=int(distance / 1000 * pace),
+            start_date=start_date.replace(microsecond=0)
+        ))
+    activities.sort(key=lambda a: a.start_date)
+    return activities
+
+
+class StubClient:
+    """Stands in for stravalib's Client, serving activities from memory."""
+
+    def __init__(self, activities: List[RunRecord]):
+        self.activities = activities
+        self.requests = 0
+
+    def get_activities(self, after=None, before=None, limit=None):
+        self.requests += 1
+        return iter([
+            a for a in self.activities
+            if (after is None or a.start_date > after) and (before is None or a.start_date < before)
+        ])
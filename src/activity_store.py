@@ -0,0 +1,225 @@
+"""
+Local activity store for RunDown - keeps fetched Strava activities on disk
+so repeated runs only download what is new.
+"""
+
+import sqlite3
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Iterable, Iterator, List, Optional
+
+from src.personal_records import PersonalRecords
+from src.run_record import RunRecord, activity_type
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS activities (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    type TEXT NOT NULL,
+    start_date REAL NOT NULL,
+    distance REAL NOT NULL,
+    moving_time INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS activities_type_start ON activities (type, start_date);
+CREATE TABLE IF NOT EXISTS sync_state (
+    key TEXT PRIMARY KEY,
+    value REAL NOT NULL
+);
+"""
+
+
+class ActivityStore:
+    """
+    SQLite-backed cache of Strava activities keyed by activity id.
+
+    The store tracks the span it has fully synced: ``synced_from`` is the
+    earliest date fetched, ``synced_until`` the time it is complete up to
+    (the end of the first synced range, then the wall-clock time of the last
+    sync) and ``cursor`` the newest activity start seen. Ranges inside that
+    span are answered locally; anything newer is fetched with
+    ``after=cursor`` so each run only pulls new activities.
+
+    ``records`` is the personal-records index, updated as runs are added.
+
+    Pass ``check_same_thread=False`` to share one store between threads; the
+    caller then serialises access (see CardService).
+    """
+
+    def __init__(self, path, check_same_thread: bool = True):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(str(self.path), check_same_thread=check_same_thread)
+        self.conn.executescript(SCHEMA)
+        self.records = PersonalRecords(self.conn)
+        if self._get_state("records_built") is None:
+            # Stores created before the index existed are indexed once
+            self.records.rebuild()
+            self._set_state("records_built", time.time())
+            self.conn.commit()
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def _get_state(self, key: str) -> Optional[float]:
+        row = self.conn.execute("SELECT value FROM sync_state WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def _set_state(self, key: str, value: float):
+        self.conn.execute(
+            "INSERT OR REPLACE INTO sync_state (key, value) VALUES (?, ?)", (key, value)
+        )
+
+    def add_activities(self, activities: Iterable) -> Optional[float]:
+        """
+        Insert or update activities in the store, offering runs to the
+        personal-records index as they pass.
+
+        Args:
+            activities: stravalib activities (or anything with the same attributes)
+
+        Returns:
+            The newest start timestamp among the added activities, or None if empty
+        """
+        newest = None
+
+        def rows():
+            nonlocal newest
+            # Consume the (paginated) iterator lazily instead of building a list
+            for activity in activities:
+                start_ts = activity.start_date.timestamp()
+                newest = start_ts if newest is None else max(newest, start_ts)
+                row = (
+                    int(activity.id),
+                    activity.name or "",
+                    activity_type(activity),
+                    start_ts,
+                    float(activity.distance or 0),
+                    int(activity.moving_time or 0),
+                )
+                if row[2] == 'Run':
+                    self.records.offer(row[0], row[4], row[5])
+                else:
+                    # A run re-typed (e.g. to Ride) must give up its places
+                    self.records.discard(row[0])
+                yield row
+
+        self.conn.executemany(
+            "INSERT OR REPLACE INTO activities "
+            "(id, name, type, start_date, distance, moving_time) VALUES (?, ?, ?, ?, ?, ?)",
+            rows()
+        )
+        self.records.save()
+        return newest
+
+    def sync(self, client, start_date: datetime, end_date: datetime) -> int:
+        """
+        Make sure the store covers ``start_date``..``end_date``, fetching only
+        the parts that have not been synced before.
+
+        Args:
+            client: Authenticated stravalib client
+            start_date: Start of the range that will be queried
+            end_date: End of the range that will be queried
+
+        Returns:
+            Number of API requests issued (0 when the range was fully cached)
+        """
+        start_ts = start_date.timestamp()
+        end_ts = end_date.timestamp()
+        synced_from = self._get_state("synced_from")
+        synced_until = self._get_state("synced_until")
+        cursor = self._get_state("cursor")
+        fetches = 0
+        now = time.time()
+
+        if synced_from is None:
+            # The first sync downloads only the requested range
+            newest = self.add_activities(client.get_activities(after=start_date, before=end_date))
+            fetches += 1
+            self._set_state("synced_from", start_ts)
+            self._set_state("cursor", max(newest or start_ts, start_ts))
+            self._set_state("synced_until", min(end_ts, now))
+        else:
+            if start_ts < synced_from:
+                before = datetime.fromtimestamp(synced_from, tz=timezone.utc)
+                self.add_activities(client.get_activities(after=start_date, before=before))
+                fetches += 1
+                self._set_state("synced_from", start_ts)
+            if end_ts > synced_until:
+                after = datetime.fromtimestamp(cursor, tz=timezone.utc)
+                newest = self.add_activities(client.get_activities(after=after))
+                fetches += 1
+                self._set_state("cursor", max(newest or cursor, cursor))
+                self._set_state("synced_until", now)
+
+        self.conn.commit()
+        return fetches
+
+    def import_activities(self, activities: Iterable, exported_at: float) -> int:
+        """
+        Add a bulk export's activities and mark the history it covers as synced.
+
+        An export holds every activity up to the time it was made, so later
+        syncs only fetch what is newer than its newest activity.
+
+        Args:
+            activities: Records of the export's activities
+            exported_at: Unix time the export was made
+
+        Returns:
+            Number of activities imported
+        """
+        count = 0
+
+        def counted():
+            nonlocal count
+            for activity in activities:
+                count += 1
+                yield activity
+
+        newest = self.add_activities(counted())
+        synced_from = self._get_state("synced_from")
+        synced_until = self._get_state("synced_until")
+        if synced_from is None or synced_until <= exported_at:
+            # The export covers everything up to when it was made, earlier syncs included
+            self._set_state("synced_from", 0.0)
+            self._set_state("synced_until", exported_at)
+        elif synced_from <= exported_at:
+            # The store already reaches past the export, which fills in the history before it
+            self._set_state("synced_from", 0.0)
+        self._set_state("cursor", max(self._get_state("cursor") or 0.0, newest or 0.0))
+        self.conn.commit()
+        return count
+
+    def iter_runs(self, start_date: datetime, end_date: datetime) -> Iterator[RunRecord]:
+        """
+        Stream the stored runs that started within a date range.
+
+        Args:
+            start_date: Start of the range (inclusive)
+            end_date: End of the range (inclusive)
+
+        Yields:
+            Runs ordered by start date, read from the database one row at a time
+        """
+        rows = self.conn.execute(
+            "SELECT id, name, type, distance, moving_time, start_date FROM activities "
+            "WHERE type = 'Run' AND start_date BETWEEN ? AND ? ORDER BY start_date",
+            (start_date.timestamp(), end_date.timestamp())
+        )
+        for row in rows:
+            yield RunRecord(
+                row[0], row[1], row[2], row[3], row[4],
+                datetime.fromtimestamp(row[5], tz=timezone.utc)
+            )
+
+    def get_runs(self, start_date: datetime, end_date: datetime) -> List[RunRecord]:
+        """Get the stored runs that started within a date range as a list."""
+        return list(self.iter_runs(start_date, end_date))
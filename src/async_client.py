@@ -0,0 +1,306 @@
+"""
+Async Strava client for RunDown - pooled HTTP session, concurrent page
+fetching and pacing based on Strava's rate-limit headers.
+
+Requires the optional aiohttp dependency (pip install -e .[async]).
+"""
+
+import asyncio
+import time
+import weakref
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional, Union
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+from src import profiling
+from src.run_record import RunRecord
+
+STRAVA_API_URL = "https://www.strava.com/api/v3"
+
+SHORT_WINDOW = 15 * 60  # Strava's short limit resets every quarter hour
+DAILY_WINDOW = 24 * 60 * 60  # and the daily limit at midnight UTC
+
+# A fixed access token, or a callback returning a fresh one; the callback is
+# passed the token Strava just rejected when a request gets a 401
+TokenSource = Union[str, Callable[..., str]]
+
+
+class RateLimitScheduler:
+    """
+    Paces requests so a batch stays within Strava's 15-minute and daily limits.
+
+    Usage is read from the X-RateLimit-* (or X-ReadRateLimit-*) response
+    headers. Requests that are in flight count against the budget, and once
+    the remaining budget drops to ``reserve`` the scheduler sleeps until the
+    window resets instead of letting the batch fail with 429s.
+
+    The usage is plain state, so one scheduler can pace several fetches run
+    one after another in separate event loops (see AsyncFetchClient); usage
+    counted in a window that has since reset is forgotten.
+    """
+
+    def __init__(self, short_limit: int = 100, daily_limit: int = 1000, reserve: int = 2,
+                 clock=time.time, sleep=asyncio.sleep):
+        self.short_limit = short_limit
+        self.daily_limit = daily_limit
+        self.short_usage = 0
+        self.daily_usage = 0
+        self.reserve = reserve
+        self.in_flight = 0
+        self.clock = clock
+        self.sleep = sleep
+        now = clock()
+        self._short_window = int(now // SHORT_WINDOW)
+        self._daily_window = int(now // DAILY_WINDOW)
+        # asyncio locks belong to one event loop, so each loop gets its own
+        self._locks = weakref.WeakKeyDictionary()
+
+    @staticmethod
+    def _seconds_until_reset(now: float, window: int) -> float:
+        return window - (now % window) + 1
+
+    def _lock(self) -> asyncio.Lock:
+        loop = asyncio.get_running_loop()
+        lock = self._locks.get(loop)
+        if lock is None:
+            lock = self._locks[loop] = asyncio.Lock()
+        return lock
+
+    def _roll_windows(self):
+        """Forget usage counted in a 15-minute or daily window that has reset since."""
+        now = self.clock()
+        short_window, daily_window = int(now // SHORT_WINDOW), int(now // DAILY_WINDOW)
+        if short_window != self._short_window:
+            self._short_window, self.short_usage = short_window, 0
+        if daily_window != self._daily_window:
+            self._daily_window, self.daily_usage = daily_window, 0
+
+    async def acquire(self):
+        """Wait until a request can be sent without exceeding the limits."""
+        async with self._lock():
+            while True:
+                self._roll_windows()
+                used_short = self.short_usage + self.in_flight
+                used_daily = self.daily_usage + self.in_flight
+                if used_daily >= self.daily_limit - self.reserve:
+                    window = DAILY_WINDOW
+                elif used_short >= self.short_limit - self.reserve:
+                    window = SHORT_WINDOW
+                else:
+                    break
+
+                delay = self._seconds_until_reset(self.clock(), window)
+                print(f"Rate limit reached, waiting {int(delay)}s for the window to reset...")
+                await self.sleep(delay)
+                self.short_usage = 0
+                if window == DAILY_WINDOW:
+                    self.daily_usage = 0
+
+            self.in_flight += 1
+
+    def release(self, headers=None):
+        """Mark a request as finished and record the usage Strava reported."""
+        self.in_flight -= 1
+        self._roll_windows()
+        # Count locally; the headers, when present, carry the authoritative usage
+        self.short_usage += 1
+        self.daily_usage += 1
+        if headers is not None:
+            self.update(headers)
+
+    def update(self, headers):
+        """Update limits and usage from a response's headers."""
+        prefix = "X-ReadRateLimit" if "X-ReadRateLimit-Usage" in headers else "X-RateLimit"
+        limit = headers.get(f"{prefix}-Limit")
+        usage = headers.get(f"{prefix}-Usage")
+        try:
+            if limit:
+                self.short_limit, self.daily_limit = (int(v) for v in limit.split(","))
+            if usage:
+                self.short_usage, self.daily_usage = (int(v) for v in usage.split(","))
+        except ValueError:
+            pass
+
+    async def backoff(self, retry_after: Optional[str] = None):
+        """Wait after a 429, honouring Retry-After when the server sends it."""
+        try:
+            delay = float(retry_after)
+        except (TypeError, ValueError):
+            delay = self._seconds_until_reset(self.clock(), SHORT_WINDOW)
+        print(f"Rate limited by Strava, retrying in {int(delay)}s...")
+        await self.sleep(delay)
+        self.short_usage = 0
+
+
+def _parse_activity(payload: Dict) -> RunRecord:
+    return RunRecord(
+        id=payload["id"],
+        name=payload.get("name") or "",
+        type=payload.get("type") or payload.get("sport_type") or "",
+        distance=float(payload.get("distance") or 0),
+        moving_time=int(payload.get("moving_time") or 0),
+        start_date=datetime.fromisoformat(
+            payload["start_date"].replace("Z", "+00:00")
+        ).astimezone(timezone.utc)
+    )
+
+
+class AsyncStravaClient:
+    """
+    Minimal asyncio Strava API client.
+
+    Use as an async context manager so the pooled session is closed::
+
+        async with AsyncStravaClient(token) as client:
+            activities = await client.get_activities(after=start, before=end)
+
+    ``token`` may be a callback (see auth.token_provider); it is asked for the
+    token before every request and refreshes it on a 401, so long-running
+    fetches survive the token expiring. ``base_url`` can point at a local
+    stand-in server for testing.
+    """
+
+    def __init__(self, token: TokenSource, base_url: str = STRAVA_API_URL,
+                 concurrency: int = 4, per_page: int = 200,
+                 scheduler: Optional[RateLimitScheduler] = None, max_retries: int = 3):
+        if aiohttp is None:
+            raise ImportError("The async client requires aiohttp: pip install aiohttp")
+        if concurrency < 1:
+            raise ValueError(f"concurrency must be at least 1, got {concurrency}")
+        self.token = token if callable(token) else (lambda stale=None: token)
+        self.base_url = base_url.rstrip("/")
+        self.concurrency = concurrency
+        self.per_page = per_page
+        self.scheduler = scheduler or RateLimitScheduler()
+        self.max_retries = max_retries
+        self.request_count = 0
+        self.session = None
+
+    async def __aenter__(self):
+        self.session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=self.concurrency)
+        )
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.session.close()
+        self.session = None
+
+    async def _get(self, path: str, params: Optional[Dict] = None):
+        """
+        GET a JSON resource, pacing with the scheduler and retrying 429s.
+
+        A 401 refreshes the token once and retries. The token callback is
+        synchronous on purpose: concurrent pages rejected together refresh in
+        turn, and all but the first get the already refreshed token back.
+        """
+        token = self.token()
+        refreshed = False
+        attempt = 0
+        while True:
+            await self.scheduler.acquire()
+            headers = None
+            status = None
+            try:
+                async with self.session.get(f"{self.base_url}{path}", params=params,
+                                            headers={"Authorization": f"Bearer {token}"}) as response:
+                    headers = response.headers
+                    status = response.status
+                    self.request_count += 1
+                    profiling.count_api_call()
+                    if status == 429 and attempt < self.max_retries:
+                        retry_after = response.headers.get("Retry-After")
+                    elif status != 401 or refreshed:
+                        response.raise_for_status()
+                        return await response.json()
+            finally:
+                self.scheduler.release(headers)
+            if status == 401:
+                refreshed = True
+                token = self.token(token)
+            else:
+                attempt += 1
+                await self.scheduler.backoff(retry_after)
+
+    async def get_activity_page(self, page: int, after: Optional[datetime] = None,
+                                before: Optional[datetime] = None) -> List[Dict]:
+        """Fetch one page of the athlete's activities as raw JSON."""
+        params = {"page": page, "per_page": self.per_page}
+        if after is not None:
+            params["after"] = int(after.timestamp())
+        if before is not None:
+            params["before"] = int(before.timestamp())
+        return await self._get("/athlete/activities", params)
+
+    async def get_activity_streams(self, activity_id: int, types=("latlng",),
+                                   resolution: Optional[str] = None) -> Dict[str, List]:
+        """Fetch an activity's streams as raw data lists keyed by stream type."""
+        params = {"keys": ",".join(types), "key_by_type": "true"}
+        if resolution is not None:
+            params["resolution"] = resolution
+        payload = await self._get(f"/activities/{activity_id}/streams", params)
+        return {key: stream.get("data", []) for key, stream in payload.items()}
+
+    async def get_activities(self, after: Optional[datetime] = None,
+                             before: Optional[datetime] = None) -> List[RunRecord]:
+        """
+        Fetch all activities in a range, requesting pages concurrently.
+
+        Pages are requested in waves of ``concurrency``; the first short page
+        marks the end, so at most ``concurrency - 1`` extra empty pages are
+        requested.
+
+        Returns:
+            Activities in page order
+        """
+        activities = []
+        first_page = 1
+        while True:
+            pages = await asyncio.gather(*(
+                self.get_activity_page(page, after, before)
+                for page in range(first_page, first_page + self.concurrency)
+            ))
+            for page in pages:
+                activities.extend(_parse_activity(payload) for payload in page)
+                if len(page) < self.per_page:
+                    return activities
+            first_page += self.concurrency
+
+
+class AsyncFetchClient:
+    """
+    Synchronous adapter exposing ``get_activities`` and ``get_activity_streams``
+    like stravalib's Client, so ActivityStore.sync(), RouteCache.fetch() and
+    main() can use the async fetch layer unchanged.
+
+    Every call runs in its own event loop, but all calls share one
+    RateLimitScheduler, so the usage Strava reported to one call paces the
+    next (e.g. the per-run stream fetches behind --routes).
+    """
+
+    def __init__(self, token: TokenSource, scheduler: Optional[RateLimitScheduler] = None, **kwargs):
+        self.token = token
+        self.scheduler = scheduler or RateLimitScheduler()
+        self.kwargs = dict(kwargs, scheduler=self.scheduler)
+
+    def get_activities(self, after: Optional[datetime] = None,
+                       before: Optional[datetime] = None) -> List[RunRecord]:
+        async def fetch():
+            async with AsyncStravaClient(self.token, **self.kwargs) as client:
+                return await client.get_activities(after=after, before=before)
+
+        with profiling.stage("fetch"):
+            return asyncio.run(fetch())
+
+    def get_activity_streams(self, activity_id: int, types=("latlng",),
+                             resolution: Optional[str] = None) -> Dict[str, List]:
+        async def fetch():
+            async with AsyncStravaClient(self.token, **self.kwargs) as client:
+                return await client.get_activity_streams(activity_id, types, resolution)
+
+        with profiling.stage("fetch"):
+            return asyncio.run(fetch())
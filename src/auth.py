@@ -1,56 +1,182 @@
 import os
+import tempfile
 import time
 
-from dotenv import load_dotenv, set_key, find_dotenv
+from dotenv import load_dotenv, find_dotenv
 from stravalib import Client, exc
 
-load_dotenv()
-dotenv_path = find_dotenv()
+# Resolved by load_env() on first use rather than at import time
+dotenv_path = None
 
+TOKEN_KEYS = ['STRAVA_ACCESS_TOKEN', 'STRAVA_REFRESH_TOKEN', 'STRAVA_TOKEN_EXPIRES']
 
-def force_reauth():
+# Refresh this many seconds before the stored expiry instead of waiting for a 401
+REFRESH_MARGIN = 5 * 60
+
+
+def load_env():
+    """Load the .env file into os.environ once, remembering where it was found."""
+    global dotenv_path
+    if dotenv_path is None:
+        dotenv_path = find_dotenv()
+        load_dotenv(dotenv_path)
+    return dotenv_path
+
+
+def save_env_values(values, path=None):
     """
-    Clears stored token values and forces a reauthorization.
+    Write several keys to the .env file in one atomic replace and mirror them
+    into os.environ.
+
+    Args:
+        values: Mapping of key to value; existing keys are updated in place
+        path: .env file to update (default: the one found by find_dotenv())
     """
-    keys = ['STRAVA_ACCESS_TOKEN', 'STRAVA_REFRESH_TOKEN', 'STRAVA_TOKEN_EXPIRES']
-    for key in keys:
-        os.environ.pop(key, None)
-        set_key(dotenv_path, key, "")
-    print("Cleared stored tokens. Please reauthorize with correct scopes.")
-    client = Client()
+    os.environ.update(values)
+    path = path or load_env() or os.path.join(os.getcwd(), '.env')
+
+    lines = []
+    if os.path.exists(path):
+        with open(path) as f:
+            lines = f.read().splitlines()
+
+    pending = dict(values)
+    for i, line in enumerate(lines):
+        key = line.split('=', 1)[0].strip()
+        if key.startswith('export '):
+            key = key[len('export '):].strip()
+        if key in pending:
+            lines[i] = f"{key}='{pending.pop(key)}'"
+    lines.extend(f"{key}='{value}'" for key, value in pending.items())
+
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), prefix='.env.')
+    try:
+        with os.fdopen(fd, 'w') as f:
+            f.write('\n'.join(lines) + '\n')
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def _apply_token_response(client, token_response):
+    """Set the tokens from an OAuth response on the client and persist them."""
+    client.access_token = token_response['access_token']
+    client.refresh_token = token_response['refresh_token']
+    values = {
+        'STRAVA_ACCESS_TOKEN': client.access_token,
+        'STRAVA_REFRESH_TOKEN': client.refresh_token,
+    }
+    if 'expires_at' in token_response:
+        client.token_expires = token_response['expires_at']
+        values['STRAVA_TOKEN_EXPIRES'] = str(client.token_expires)
+    save_env_values(values)
+
+
+def _exchange_code(client, scope=('activity:read_all',), return_athlete=False):
+    """Prompt for an authorization code and exchange it for tokens."""
     auth_url = client.authorization_url(
         client_id=os.getenv('STRAVA_CLIENT_ID'),
         redirect_uri='http://localhost:5000/authorized',
-        scope=['activity:read_all']
+        scope=list(scope)
     )
     print(f"Authorize here: {auth_url}")
     code = input("Enter code from redirect URL: ").strip()
-    token_response = client.exchange_code_for_token(
+    return client.exchange_code_for_token(
         client_id=os.getenv('STRAVA_CLIENT_ID'),
         client_secret=os.getenv('STRAVA_CLIENT_SECRET'),
-        code=code
+        code=code,
+        return_athlete=return_athlete
     )
-    access_token = token_response['access_token']
-    refresh_token = token_response['refresh_token']
-    if 'expires_at' in token_response:
-        client.token_expires = token_response['expires_at']
-        set_key(dotenv_path, 'STRAVA_TOKEN_EXPIRES', str(client.token_expires))
-        os.environ['STRAVA_TOKEN_EXPIRES'] = str(client.token_expires)
-    os.environ['STRAVA_ACCESS_TOKEN'] = access_token
-    os.environ['STRAVA_REFRESH_TOKEN'] = refresh_token
-    set_key(dotenv_path, 'STRAVA_ACCESS_TOKEN', access_token)
-    set_key(dotenv_path, 'STRAVA_REFRESH_TOKEN', refresh_token)
-    client.access_token = access_token
-    client.refresh_token = refresh_token
+
+
+def _authorize(client):
+    """Run the interactive OAuth flow and store the resulting tokens."""
+    _apply_token_response(client, _exchange_code(client))
+
+
+def _refresh(client):
+    """Exchange the refresh token for a new access token and store it."""
+    refresh_response = client.refresh_access_token(
+        client_id=os.getenv('STRAVA_CLIENT_ID'),
+        client_secret=os.getenv('STRAVA_CLIENT_SECRET'),
+        refresh_token=client.refresh_token
+    )
+    _apply_token_response(client, refresh_response)
+
+
+def force_reauth(client=None):
+    """
+    Clears stored token values and forces a reauthorization.
+    """
+    load_env()
+    save_env_values({key: "" for key in TOKEN_KEYS})
+    print("Cleared stored tokens. Please reauthorize with correct scopes.")
+    client = client or Client()
+    _authorize(client)
     return client
 
 
+def _retry_on_unauthorized(client):
+    """
+    Make the client recover from a 401 on its first real API call.
+
+    The token is not validated up front; instead, when Strava rejects a
+    request the token is refreshed (or, for missing scopes, reauthorized)
+    and the request is retried once.
+    """
+    request = client.protocol._request
+
+    def _request(url, *args, **kwargs):
+        try:
+            return request(url, *args, **kwargs)
+        except exc.AccessUnauthorized as e:
+            if "/oauth/token" in url:
+                raise
+            error_details = e.response
+            # Check if the error is related to missing activity read permission
+            if isinstance(error_details, list) and any(
+                    item.get('field') == 'activity:read_permission' for item in error_details
+            ):
+                print("Token missing required permissions. Forcing reauthorization...")
+                force_reauth(client)
+            else:
+                print("Access token invalid during API call. Refreshing token...")
+                _refresh(client)
+            try:
+                return request(url, *args, **kwargs)
+            except exc.AccessUnauthorized:
+                print("Token refresh failed. Exiting.")
+                raise
+
+    client.protocol._request = _request
+    return client
+
+
+def token_provider(client):
+    """
+    Access-token callback for fetch layers that bypass stravalib (AsyncFetchClient).
+
+    Called with no argument before each request, it refreshes the token when
+    the stored expiry is close. Called with the token Strava just rejected,
+    it refreshes once; later calls with the same stale token get the new one.
+    """
+    def access_token(stale=None):
+        expired = client.token_expires and time.time() > client.token_expires - REFRESH_MARGIN
+        if expired or (stale is not None and stale == client.access_token):
+            print("Access token expired or rejected. Refreshing token...")
+            _refresh(client)
+        return client.access_token
+
+    return access_token
+
+
 def authenticate_strava():
+    load_env()
     client = Client()
 
     # Load tokens and token expiration if they exist
     access_token = os.getenv('STRAVA_ACCESS_TOKEN')
-    refresh_token = os.getenv('STRAVA_REFRESH_TOKEN')
     token_expires_str = os.getenv('STRAVA_TOKEN_EXPIRES')
     if token_expires_str:
         try:
@@ -61,87 +187,15 @@ def authenticate_strava():
     # Initial authentication if no token exists
     if not access_token:
         print("No existing token found. Starting OAuth flow...")
-        auth_url = client.authorization_url(
-            client_id=os.getenv('STRAVA_CLIENT_ID'),
-            redirect_uri='http://localhost:5000/authorized',
-            scope=['activity:read_all']
-        )
-        print(f"Authorize here: {auth_url}")
-        code = input("Enter code from redirect URL: ").strip()
-        token_response = client.exchange_code_for_token(
-            client_id=os.getenv('STRAVA_CLIENT_ID'),
-            client_secret=os.getenv('STRAVA_CLIENT_SECRET'),
-            code=code
-        )
-        access_token = token_response['access_token']
-        refresh_token = token_response['refresh_token']
-        if 'expires_at' in token_response:
-            client.token_expires = token_response['expires_at']
-            set_key(dotenv_path, 'STRAVA_TOKEN_EXPIRES', str(client.token_expires))
-            os.environ['STRAVA_TOKEN_EXPIRES'] = str(client.token_expires)
-        os.environ['STRAVA_ACCESS_TOKEN'] = access_token
-        os.environ['STRAVA_REFRESH_TOKEN'] = refresh_token
-        set_key(dotenv_path, 'STRAVA_ACCESS_TOKEN', access_token)
-        set_key(dotenv_path, 'STRAVA_REFRESH_TOKEN', refresh_token)
-
-    # Set tokens in client
-    client.access_token = access_token
-    client.refresh_token = refresh_token
-
-    # Check token expiration based on stored timestamp
-    if client.token_expires and time.time() > client.token_expires:
-        print("Token expired based on timestamp. Refreshing...")
-        refresh_response = client.refresh_access_token(
-            client_id=os.getenv('STRAVA_CLIENT_ID'),
-            client_secret=os.getenv('STRAVA_CLIENT_SECRET'),
-            refresh_token=refresh_token
-        )
-        access_token = refresh_response['access_token']
-        refresh_token = refresh_response['refresh_token']
+        _authorize(client)
+    else:
         client.access_token = access_token
-        if 'expires_at' in refresh_response:
-            client.token_expires = refresh_response['expires_at']
-            set_key(dotenv_path, 'STRAVA_TOKEN_EXPIRES', str(client.token_expires))
-            os.environ['STRAVA_TOKEN_EXPIRES'] = str(client.token_expires)
-        os.environ['STRAVA_ACCESS_TOKEN'] = access_token
-        os.environ['STRAVA_REFRESH_TOKEN'] = refresh_token
-        set_key(dotenv_path, 'STRAVA_ACCESS_TOKEN', access_token)
-        set_key(dotenv_path, 'STRAVA_REFRESH_TOKEN', refresh_token)
-
-    # Test token validity by fetching the athlete.
-    try:
-        client.get_athlete()
-    except exc.AccessUnauthorized as e:
-        error_details = e.response
-        # Check if the error is related to missing activity read permission
-        if isinstance(error_details, list) and any(
-                item.get('field') == 'activity:read_permission' for item in error_details
-        ):
-            print("Token missing required permissions. Forcing reauthorization...")
-            client = force_reauth()
-        else:
-            print("Access token invalid during API call. Refreshing token...")
-            refresh_response = client.refresh_access_token(
-                client_id=os.getenv('STRAVA_CLIENT_ID'),
-                client_secret=os.getenv('STRAVA_CLIENT_SECRET'),
-                refresh_token=refresh_token
-            )
-            access_token = refresh_response['access_token']
-            refresh_token = refresh_response['refresh_token']
-            client.access_token = access_token
-            if 'expires_at' in refresh_response:
-                client.token_expires = refresh_response['expires_at']
-                set_key(dotenv_path, 'STRAVA_TOKEN_EXPIRES', str(client.token_expires))
-                os.environ['STRAVA_TOKEN_EXPIRES'] = str(client.token_expires)
-            os.environ['STRAVA_ACCESS_TOKEN'] = access_token
-            os.environ['STRAVA_REFRESH_TOKEN'] = refresh_token
-            set_key(dotenv_path, 'STRAVA_ACCESS_TOKEN', access_token)
-            set_key(dotenv_path, 'STRAVA_REFRESH_TOKEN', refresh_token)
-            # Optionally, retry the test API call
-            try:
-                client.get_athlete()
-            except exc.AccessUnauthorized as e:
-                print("Token refresh failed. Exiting.")
-                raise e
+        client.refresh_token = os.getenv('STRAVA_REFRESH_TOKEN')
 
-    return client
+        # Refresh proactively when the stored expiry is close; a token that is
+        # still valid is trusted without an extra validation request
+        if client.token_expires and time.time() > client.token_expires - REFRESH_MARGIN:
+            print("Token expired or about to expire. Refreshing...")
+            _refresh(client)
+
+    return _retry_on_unauthorized(client)
@@ -0,0 +1,407 @@
+"""
+Strava bulk-export importer for RunDown - reads an account export zip
+(activities.csv plus the original GPX/TCX/FIT files, gzipped or not)
+without extracting it and yields run records, so years of history can be
+backfilled offline instead of through the rate-limited API.
+
+activities.csv carries every field a record needs for most activities.
+Activity files are only parsed - streamed straight from the zip, across a
+process pool - for runs the CSV has no distance or moving time for, and for
+route tracks when a route cache is given.
+
+FIT files need the optional fitparse dependency (pip install -e .[fit]);
+without it they are skipped.
+"""
+
+import csv
+import gzip
+import io
+import math
+import os
+import zipfile
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from functools import lru_cache
+from typing import Dict, Iterator, List, Optional
+from xml.etree import ElementTree
+
+from dateutil import parser as date_parser
+
+try:
+    import fitparse
+except ImportError:
+    fitparse = None
+
+from src.route_cache import RouteCache, _simplify_track
+from src.run_record import RunRecord
+
+ACTIVITIES_CSV = "activities.csv"
+# activities.csv writes dates like "Feb 12, 2019, 6:11:35 PM" (UTC)
+CSV_DATE_FORMAT = "%b %d, %Y, %I:%M:%S %p"
+# Zip timestamps carry no time zone; reading one as UTC is off by at most
+# this much, so the export is treated as complete only up to that much earlier
+EXPORT_TIME_SLACK = 24 * 60 * 60
+
+# Slower than this between two track points counts as stopped (m/s)
+MIN_MOVING_SPEED = 0.5
+EARTH_RADIUS = 6371008.8  # metres
+FIT_SEMICIRCLES = 180 / 2 ** 31
+XML_CHUNK_SIZE = 64 * 1024
+
+
+@dataclass
+class ParsedActivity:
+    """What an activity file adds to its CSV row."""
+    distance: float  # metres
+    moving_time: int  # seconds
+    track: array  # Simplified interleaved lat/lng (see route_cache)
+
+
+def _haversine(lat1: float, lng1: float, lat2: float, lng2: float) -> float:
+    """Great-circle distance between two points in metres."""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dphi = phi2 - phi1
+    dlambda = math.radians(lng2 - lng1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlambda / 2) ** 2
+    return 2 * EARTH_RADIUS * math.asin(math.sqrt(a))
+
+
+def _parse_time(value: str) -> Optional[datetime]:
+    """ISO 8601 timestamp of a track point as an aware UTC datetime."""
+    try:
+        parsed = datetime.fromisoformat(value.strip().replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.astimezone(timezone.utc)
+
+
+def _summarise(points: List, distance: Optional[float] = None,
+               moving_time: Optional[float] = None) -> ParsedActivity:
+    """
+    Distance and moving time of a track, preferring the totals the file
+    recorded itself.
+
+    Args:
+        points: (timestamp or None, lat or None, lng or None) tuples in order
+        distance: Recorded total distance in metres, if any
+        moving_time: Recorded timer time in seconds, if any
+    """
+    latlng = [(lat, lng) for _, lat, lng in points if lat is not None]
+
+    if distance is None or moving_time is None:
+        walked, moving = 0.0, 0.0
+        previous = None
+        for time, lat, lng in points:
+            if lat is None or time is None:
+                continue
+            if previous is not None:
+                step = _haversine(previous[1], previous[2], lat, lng)
+                seconds = (time - previous[0]).total_seconds()
+                walked += step
+                if seconds > 0 and step / seconds >= MIN_MOVING_SPEED:
+                    moving += seconds
+            previous = (time, lat, lng)
+        distance = walked if distance is None else distance
+        moving_time = moving if moving_time is None else moving_time
+
+    return ParsedActivity(float(distance), int(round(moving_time)), _simplify_track(latlng))
+
+
+@lru_cache(maxsize=256)
+def _local_name(tag: str) -> str:
+    return tag.rsplit("}", 1)[-1]
+
+
+def _iter_xml(stream) -> Iterator[ElementTree.Element]:
+    """
+    Stream the closed elements of an XML document chunk by chunk.
+
+    Leading whitespace is dropped first; Strava's TCX files often have some
+    before the XML declaration, which strict parsers reject.
+    """
+    parser = ElementTree.XMLPullParser(events=("end",))
+    started = False
+    while True:
+        chunk = stream.read(XML_CHUNK_SIZE)
+        if not chunk:
+            break
+        if not started:
+            chunk = chunk.lstrip()
+            if not chunk:
+                continue
+            started = True
+        parser.feed(chunk)
+        for _, element in parser.read_events():
+            yield element
+    parser.close()
+    for _, element in parser.read_events():
+        yield element
+
+
+def _parse_gpx(stream) -> ParsedActivity:
+    points = []
+    for element in _iter_xml(stream):
+        if _local_name(element.tag) != "trkpt":
+            continue
+        time = next((_parse_time(child.text or "") for child in element
+                     if _local_name(child.tag) == "time"), None)
+        points.append((time, float(element.get("lat")), float(element.get("lon"))))
+        element.clear()
+    return _summarise(points)
+
+
+def _parse_tcx(stream) -> ParsedActivity:
+    points = []
+    lap_distance, lap_time = 0.0, 0.0
+    has_laps = False
+    for element in _iter_xml(stream):
+        name = _local_name(element.tag)
+        if name == "Trackpoint":
+            values = {_local_name(child.tag): child for child in element}
+            position = values.get("Position")
+            lat = lng = None
+            if position is not None:
+                coordinates = {_local_name(child.tag): child.text for child in position}
+                lat = float(coordinates["LatitudeDegrees"])
+                lng = float(coordinates["LongitudeDegrees"])
+            time = _parse_time(values["Time"].text or "") if "Time" in values else None
+            points.append((time, lat, lng))
+            element.clear()
+        elif name == "Lap":
+            # Lap totals are direct children of the Lap; track points were cleared already
+            for child in element:
+                child_name = _local_name(child.tag)
+                if child_name == "DistanceMeters":
+                    lap_distance += float(child.text)
+                    has_laps = True
+                elif child_name == "TotalTimeSeconds":
+                    lap_time += float(child.text)
+            element.clear()
+    if has_laps:
+        return _summarise(points, lap_distance, lap_time)
+    return _summarise(points)
+
+
+def _parse_fit(stream) -> Optional[ParsedActivity]:
+    """Parse a FIT file with fitparse; None when it is not installed."""
+    if fitparse is None:
+        return None
+    fit = fitparse.FitFile(stream.read())
+    points = []
+    distance = moving_time = None
+    for message in fit.get_messages(["record", "session"]):
+        values = message.get_values()
+        if message.name == "session":
+            distance = values.get("total_distance")
+            moving_time = values.get("total_timer_time")
+            continue
+        time = values.get("timestamp")
+        if time is not None and time.tzinfo is None:
+            time = time.replace(tzinfo=timezone.utc)  # FIT timestamps are UTC
+        lat, lng = values.get("position_lat"), values.get("position_long")
+        if lat is None or lng is None:
+            points.append((time, None, None))
+        else:
+            points.append((time, lat * FIT_SEMICIRCLES, lng * FIT_SEMICIRCLES))
+    return _summarise(points, distance, moving_time)
+
+
+PARSERS = {"gpx": _parse_gpx, "tcx": _parse_tcx, "fit": _parse_fit}
+
+
+def file_format(member: str) -> Optional[str]:
+    """The format of an activity file ("gpx", "tcx" or "fit"), ignoring a .gz suffix."""
+    name = member.lower()
+    if name.endswith(".gz"):
+        name = name[:-3]
+    extension = os.path.splitext(name)[1].lstrip(".")
+    return extension if extension in PARSERS else None
+
+
+def parse_member(archive: zipfile.ZipFile, member: str) -> Optional[ParsedActivity]:
+    """
+    Parse an activity file streamed from the export, decompressing .gz on the fly.
+
+    Returns:
+        The parsed activity, or None for unsupported (or unreadable) files
+    """
+    parse = PARSERS.get(file_format(member))
+    if parse is None:
+        return None
+    with archive.open(member) as raw:
+        stream = gzip.GzipFile(fileobj=raw) if member.lower().endswith(".gz") else raw
+        try:
+            return parse(stream)
+        except (ElementTree.ParseError, ValueError, KeyError, OSError, EOFError) as e:
+            print(f"Could not parse {member}: {e}")
+            return None
+        except Exception as e:
+            # fitparse raises its own errors for corrupt files
+            if fitparse is not None and isinstance(e, fitparse.FitParseError):
+                print(f"Could not parse {member}: {e}")
+                return None
+            raise
+
+
+# The export opened once per worker process by _init_worker
+_worker_archive = None
+
+
+def _init_worker(path):
+    global _worker_archive
+    _worker_archive = zipfile.ZipFile(path)
+
+
+def _parse_job(member: str) -> Optional[ParsedActivity]:
+    return parse_member(_worker_archive, member)
+
+
+def _column_indices(header: List[str]) -> Dict[str, List[int]]:
+    """Column positions by name; the export repeats some names (see _read_row)."""
+    indices = {}
+    for i, name in enumerate(header):
+        indices.setdefault(name.strip(), []).append(i)
+    return indices
+
+
+def _number(value: str) -> Optional[float]:
+    value = value.strip().replace(",", "")
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        return None
+
+
+def _parse_csv_date(value: str) -> datetime:
+    try:
+        parsed = datetime.strptime(value.strip(), CSV_DATE_FORMAT)
+    except ValueError:
+        parsed = date_parser.parse(value)
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.astimezone(timezone.utc)
+
+
+def _read_row(row: List[str], columns: Dict[str, List[int]]) -> Dict:
+    """
+    One activities.csv row as record fields, plus its file name.
+
+    Recent exports have two "Distance" columns: kilometres (as displayed)
+    followed by the precise metres, and add "Moving Time" in seconds. Older
+    exports only have the kilometres and no moving time.
+    """
+    def cell(name, which=0):
+        positions = columns.get(name)
+        if not positions:
+            return ""
+        position = positions[which]
+        return row[position] if position < len(row) else ""
+
+    distance = None
+    if len(columns.get("Distance", ())) > 1:
+        distance = _number(cell("Distance", -1))
+    elif _number(cell("Distance")) is not None:
+        distance = _number(cell("Distance")) * 1000
+    moving_time = _number(cell("Moving Time"))
+
+    return {
+        "id": int(cell("Activity ID")),
+        "name": cell("Activity Name"),
+        # Display names ("Virtual Run") to API types ("VirtualRun")
+        "type": cell("Activity Type").replace(" ", "").replace("-", ""),
+        "distance": distance,
+        "moving_time": moving_time,
+        "start_date": _parse_csv_date(cell("Activity Date")),
+        "filename": cell("Filename").strip(),
+    }
+
+
+def exported_at(path) -> float:
+    """
+    Unix time the export is known to be complete up to: the activities.csv
+    timestamp in the zip, less EXPORT_TIME_SLACK.
+
+    The timestamp is the wall-clock time of whatever zone the export was
+    written in, so it is only trusted to within a day; activities in that
+    last day are fetched again by the next sync.
+    """
+    with zipfile.ZipFile(path) as archive:
+        info = archive.getinfo(ACTIVITIES_CSV)
+    return datetime(*info.date_time, tzinfo=timezone.utc).timestamp() - EXPORT_TIME_SLACK
+
+
+def iter_export(path, workers: Optional[int] = None,
+                route_cache: Optional[RouteCache] = None) -> Iterator[RunRecord]:
+    """
+    Stream the activities of a Strava bulk export as run records.
+
+    Args:
+        path: Export zip (as downloaded from Strava's "Download your data")
+        workers: Processes parsing activity files (default: CPU cores)
+        route_cache: Store the runs' GPS tracks here so route thumbnails need
+            no API calls; runs already in the cache are not parsed for it
+
+    Yields:
+        One record per activity, in activities.csv order
+
+    Raises:
+        ValueError: If the zip has no activities.csv
+    """
+    with zipfile.ZipFile(path) as archive:
+        if ACTIVITIES_CSV not in archive.namelist():
+            raise ValueError(f"{path} is not a Strava export (no {ACTIVITIES_CSV})")
+        with archive.open(ACTIVITIES_CSV) as raw:
+            reader = csv.reader(io.TextIOWrapper(raw, encoding="utf-8-sig", newline=""))
+            columns = _column_indices(next(reader, []))
+            rows = [_read_row(row, columns) for row in reader if row]
+        members = set(archive.namelist())
+
+    # Only runs are parsed: records need nothing else from the files
+    def needs_file(row):
+        if row["type"] != "Run" or row["filename"] not in members or not file_format(row["filename"]):
+            return False
+        if fitparse is None and file_format(row["filename"]) == "fit":
+            return False
+        if row["distance"] is None or row["moving_time"] is None:
+            return True
+        return route_cache is not None and route_cache.get(row["id"]) is None
+
+    parse_rows = [needs_file(row) for row in rows]
+    jobs = [row["filename"] for row, parse in zip(rows, parse_rows) if parse]
+    if fitparse is None:
+        skipped = sum(1 for row in rows if row["type"] == "Run" and file_format(row["filename"]) == "fit")
+        if skipped:
+            print(f"Skipping {skipped} FIT files (pip install fitparse to read them)")
+
+    workers = min(workers or os.cpu_count() or 1, len(jobs))
+    executor = archive = None
+    if workers > 1:
+        executor = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(str(path),))
+        parsed = executor.map(_parse_job, jobs, chunksize=max(1, len(jobs) // (workers * 4)))
+    else:
+        archive = zipfile.ZipFile(path)
+        parsed = (parse_member(archive, member) for member in jobs)
+
+    try:
+        for row, parse in zip(rows, parse_rows):
+            activity = next(parsed) if parse else None
+            if activity is not None:
+                if row["distance"] is None:
+                    row["distance"] = activity.distance
+                if row["moving_time"] is None:
+                    row["moving_time"] = activity.moving_time
+                if route_cache is not None:
+                    route_cache.put(row["id"], activity.track)
+            yield RunRecord(row["id"], row["name"], row["type"], float(row["distance"] or 0),
+                            int(row["moving_time"] or 0), row["start_date"])
+    finally:
+        if executor is not None:
+            executor.shutdown(cancel_futures=True)
+        if archive is not None:
+            archive.close()
@@ -3,7 +3,7 @@ Date utilities for RunDown - simplified for flexible date handling
 """
 
 from datetime import datetime, timedelta, timezone
-from typing import Tuple
+from typing import Iterator, Tuple
 
 
 def parse_date_input(date_str: str) -> datetime:
@@ -63,6 +63,25 @@ def get_week_range(reference_date: datetime = None) -> Tuple[datetime, datetime]
     return monday_start, sunday_end
 
 
+def iter_week_ranges(start_date: datetime, end_date: datetime) -> Iterator[Tuple[datetime, datetime]]:
+    """
+    Yield the Monday-Sunday week ranges covering a span of dates.
+
+    Args:
+        start_date: Any date within the first week
+        end_date: Any date within the last week
+
+    Yields:
+        Tuples of (monday_start, sunday_end) as returned by get_week_range()
+    """
+    monday_start, sunday_end = get_week_range(start_date)
+    last_monday, _ = get_week_range(end_date)
+    while monday_start <= last_monday:
+        yield monday_start, sunday_end
+        monday_start += timedelta(days=7)
+        sunday_end += timedelta(days=7)
+
+
 def format_date_range(start_date: datetime, end_date: datetime) -> str:
     """
     Format a date range for display.
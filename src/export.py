@@ -0,0 +1,126 @@
+"""
+Headless stats export for RunDown - JSON/CSV output of the computed stats
+without importing or running the image renderer.
+"""
+
+import csv
+import json
+import sys
+from datetime import datetime
+from typing import Dict, IO, Iterable, List, Optional
+
+from src.run_data_processor import RunAccumulator, process_run_stream
+
+FORMATS = ("json", "csv")
+
+CSV_FIELDS = [
+    "label", "start_date", "end_date", "total_runs", "total_distance_km",
+    "total_moving_time_s", "average_pace_s_per_km",
+]
+RUN_FIELDS = ["id", "name", "start_date", "distance_km", "moving_time_s", "pace_s_per_km"]
+
+
+def run_to_dict(run) -> Optional[Dict]:
+    """Numeric, JSON-serialisable view of a single run."""
+    if run is None:
+        return None
+    return {
+        "id": run.id,
+        "name": run.name,
+        "start_date": run.start_date.isoformat(),
+        "distance_km": round(run.distance / 1000, 3),
+        "moving_time_s": run.moving_time,
+        "pace_s_per_km": round(run.moving_time / (run.distance / 1000), 1) if run.distance > 0 else None,
+    }
+
+
+def stats_to_dict(accumulator: RunAccumulator, start_date: Optional[datetime] = None,
+                  end_date: Optional[datetime] = None, label: Optional[str] = None) -> Dict:
+    """
+    Numeric, JSON-serialisable view of an accumulator's stats.
+
+    Args:
+        accumulator: Accumulator the period's runs were folded into
+        start_date: Start of the period, if known
+        end_date: End of the period, if known
+        label: Display label of the period
+
+    Returns:
+        Dict with the period, totals, and longest/fastest runs
+    """
+    stats = accumulator.stats
+    average_pace = stats.average_pace
+    return {
+        "label": label,
+        "start_date": start_date.date().isoformat() if start_date else None,
+        "end_date": end_date.date().isoformat() if end_date else None,
+        "total_runs": stats.total_runs,
+        "total_distance_km": round(stats.total_distance_km, 3),
+        "total_moving_time_s": stats.total_moving_time,
+        "average_pace_s_per_km": round(average_pace, 1) if average_pace is not None else None,
+        "longest_run": run_to_dict(accumulator.longest_run),
+        "fastest_run": run_to_dict(accumulator.fastest_run),
+    }
+
+
+def compute_stats(activities: Iterable, start_date: Optional[datetime] = None,
+                  end_date: Optional[datetime] = None, label: Optional[str] = None) -> Dict:
+    """
+    Library entry point: fold activities (runs are filtered out) into a stats dict.
+
+    Args:
+        activities: Iterable of stravalib activities or run records
+        start_date: Start of the period, if known
+        end_date: End of the period, if known
+        label: Display label of the period
+
+    Returns:
+        Dict as returned by stats_to_dict()
+    """
+    return stats_to_dict(process_run_stream(activities), start_date, end_date, label)
+
+
+def _csv_row(period: Dict) -> Dict:
+    row = {field: period[field] for field in CSV_FIELDS}
+    for key in ("longest_run", "fastest_run"):
+        run = period[key] or {}
+        for field in RUN_FIELDS:
+            row[f"{key}_{field}"] = run.get(field)
+    return row
+
+
+def write_stats(periods: List[Dict], fmt: str, stream: IO, single: bool = False):
+    """
+    Write stats dicts to a text stream.
+
+    Args:
+        periods: Stats dicts as returned by stats_to_dict()
+        fmt: "json" or "csv"
+        stream: Text stream to write to
+        single: Write a JSON object instead of a list (single period)
+    """
+    if fmt == "json":
+        json.dump(periods[0] if single else periods, stream, indent=2)
+        stream.write("\n")
+    elif fmt == "csv":
+        fieldnames = CSV_FIELDS + [
+            f"{key}_{field}" for key in ("longest_run", "fastest_run") for field in RUN_FIELDS
+        ]
+        writer = csv.DictWriter(stream, fieldnames=fieldnames)
+        writer.writeheader()
+        writer.writerows(_csv_row(period) for period in periods)
+    else:
+        raise ValueError(f"Unsupported export format: {fmt}. Use one of {', '.join(FORMATS)}.")
+
+
+def export_stats(periods: List[Dict], fmt: str, output=None, single: bool = False):
+    """
+    Write stats dicts to a file path or an open text stream (default: stdout).
+    """
+    if output is None:
+        output = sys.stdout
+    if hasattr(output, "write"):
+        write_stats(periods, fmt, output, single)
+        return
+    with open(output, "w", newline="") as f:
+        write_stats(periods, fmt, f, single)
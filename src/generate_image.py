@@ -1,6 +1,156 @@
 from PIL import Image, ImageDraw, ImageFont
+from dataclasses import dataclass, replace
+from typing import Optional
+import functools
 import os
 
+from src import profiling
+
+
+@dataclass(frozen=True)
+class EncoderOptions:
+    """How the rendered image is encoded when saved."""
+    format: Optional[str] = None  # PNG, WEBP or JPEG; None infers it from the output path
+    quality: Optional[int] = None  # WEBP/JPEG quality (1-100)
+    compress_level: Optional[int] = None  # PNG zlib level (0-9)
+    optimize: bool = False  # Extra PNG/JPEG size optimisation pass
+    colors: Optional[int] = None  # Quantise to a palette of this many colours
+    method: Optional[int] = None  # WEBP encoder effort (0 fast - 6 small)
+
+    @property
+    def extension(self):
+        return {"JPEG": "jpg"}.get(self.format, (self.format or "png").lower())
+
+    def save_kwargs(self):
+        """Keyword arguments for PIL.Image.save()."""
+        kwargs = {}
+        if self.format:
+            kwargs["format"] = self.format
+        if self.quality is not None:
+            kwargs["quality"] = self.quality
+        if self.compress_level is not None:
+            kwargs["compress_level"] = self.compress_level
+        if self.optimize:
+            kwargs["optimize"] = True
+        if self.method is not None:
+            kwargs["method"] = self.method
+        return kwargs
+
+    @classmethod
+    def from_preset(cls, name="default", **overrides):
+        """Build options from a named preset, overriding any non-None fields."""
+        try:
+            options = ENCODER_PRESETS[name]
+        except KeyError:
+            raise ValueError(f"Unknown encoder preset: {name}. Use one of {', '.join(ENCODER_PRESETS)}.")
+        return replace(options, **{k: v for k, v in overrides.items() if v is not None})
+
+
+# Named encoder presets; the flat-colour card design quantises well to a small palette
+ENCODER_PRESETS = {
+    "default": EncoderOptions(),
+    "fast": EncoderOptions(compress_level=1),
+    "small": EncoderOptions(colors=32, optimize=True),
+    "web": EncoderOptions(format="WEBP", quality=90, method=4),
+}
+
+
+# Process-wide font registry keyed by (font file, size)
+_font_registry = {}
+
+
+def get_font(font_path, size):
+    """Load a TrueType font, parsing each (file, size) pair only once per process."""
+    key = (font_path, size)
+    font = _font_registry.get(key)
+    if font is None:
+        font = ImageFont.truetype(font_path, size)
+        _font_registry[key] = font
+    return font
+
+
+# Distinct (text, font) pairs kept measured and rasterised; labels, titles and
+# badges repeat on every card, so a batch shares their text shaping
+TEXT_CACHE_SIZE = 512
+
+
+@functools.lru_cache(maxsize=TEXT_CACHE_SIZE)
+def text_bbox(text, font):
+    """Bounding box of text drawn at the origin, measured once per (text, font) pair."""
+    return font.getbbox(text, "L")
+
+
+@functools.lru_cache(maxsize=TEXT_CACHE_SIZE)
+def text_mask(text, font):
+    """
+    Text rasterised once into an "L" mask, for pasting instead of redrawing.
+
+    Returns:
+        (mask, (left, top)) where (left, top) is the mask's offset from the
+        drawing position, or (None, (0, 0)) for text without ink
+    """
+    left, top, right, bottom = text_bbox(text, font)
+    if right <= left or bottom <= top:
+        return None, (0, 0)
+    mask = Image.new("L", (right - left, bottom - top))
+    ImageDraw.Draw(mask).text((-left, -top), text, font=font, fill=255)
+    return mask, (left, top)
+
+
+@functools.lru_cache(maxsize=None)
+def _find_fonts_dir():
+    """Locate the Poppins fonts directory once per process."""
+    # Get the directory where this script is located
+    current_dir = os.path.dirname(os.path.abspath(__file__))
+
+    # Try different possible paths for the assets folder
+    possible_asset_paths = [
+        # If running from src/ directory, assets is one level up
+        os.path.join(current_dir, "../assets/fonts/Poppins"),
+        # If assets is at the same level as src
+        os.path.join(current_dir, "../assets/fonts"),
+        # If running from project root
+        os.path.join(current_dir, "assets/fonts/Poppins"),
+    ]
+
+    for path in possible_asset_paths:
+        if os.path.exists(path):
+            return os.path.abspath(path)
+
+    print("Warning: Could not find Poppins fonts directory.")
+    print("Searched paths:")
+    for path in possible_asset_paths:
+        print(f"  - {path}")
+    print("Using fallback fonts...")
+    return None
+
+
+@functools.lru_cache(maxsize=None)
+def _find_fallback_font():
+    """Find a usable system TrueType font once per process."""
+    # Common system font paths on Linux/Unix systems
+    common_fonts = [
+        "/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf",
+        "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf",
+        "/usr/share/fonts/truetype/liberation/LiberationSans-Bold.ttf",
+        "/usr/share/fonts/truetype/liberation/LiberationSans-Regular.ttf",
+        "/System/Library/Fonts/Arial.ttf",  # macOS
+        "/System/Library/Fonts/Helvetica.ttc",  # macOS
+        "C:/Windows/Fonts/arial.ttf",  # Windows
+        "C:/Windows/Fonts/calibri.ttf",  # Windows
+    ]
+
+    for font_path in common_fonts:
+        if os.path.exists(font_path):
+            try:
+                ImageFont.truetype(font_path, 12)
+                return font_path
+            except Exception:
+                continue
+
+    print("Warning: No system TrueType font found, using default font")
+    return None
+
 
 class StravaStatsImage:
     """Class to generate Strava weekly statistics images."""
@@ -23,127 +173,123 @@ class StravaStatsImage:
         "height": 1920
     }
 
-    def __init__(self, data, output_path="strava_stats.png", week_label="WEEKLY STATS"):
-        """Initialize with stats data and configuration."""
+    # Font files (within the Poppins assets directory) and sizes per role
+    FONT_FILES = {
+        "title": "Poppins-Bold.ttf",
+        "header": "Poppins-SemiBold.ttf",
+        "text": "Poppins-Medium.ttf",
+        "value": "Poppins-Bold.ttf",
+        "label": "Poppins-Regular.ttf"
+    }
+    FONT_SIZES = {
+        "title": 90,
+        "header": 65,
+        "text": 34,
+        "value": 50,
+        "label": 28
+    }
+
+    # Cards drawn top to bottom as (title, data key); None is the summary card
+    CARDS = (
+        ("FASTEST RUN", "fastest_run"),
+        ("LONGEST RUN", "longest_run"),
+        ("SUMMARY", None)
+    )
+    CARD_HEIGHT = 450
+    CARD_SPACING = 50
+    # Route thumbnail box, drawn in the bottom-right grid cell of the run cards
+    ROUTE_SIZE = (440, 130)
+    WATERMARK = "WEEKLY RUNNING STATS"
+
+    # Named output sizes. Lengths above are for the LAYOUT size and scale with
+    # the image, so any size can be drawn; a size with the aspect ratio of a
+    # larger one (the thumbnail) is downscaled from its render instead
+    OUTPUT_SIZES = {
+        "story": (1080, 1920),
+        "square": (1080, 1080),
+        "thumbnail": (270, 480),
+    }
+    DEFAULT_SIZE = "story"
+
+    # Static layers shared by all instances, keyed by colors, size, fonts and layout
+    TEMPLATE_CACHE_SIZE = 16
+
+    # Bump when the drawing code changes so cached renders are invalidated
+    RENDER_VERSION = 1
+    _template_cache = {}
+
+    def __init__(self, data, output_path="strava_stats.png", week_label="WEEKLY STATS", fonts=None,
+                 encoder=None, size=None):
+        """Initialize with stats data and configuration.
+
+        Pass ``fonts`` (as returned by load_fonts() for this image's scale) to
+        reuse already loaded fonts, ``encoder`` (EncoderOptions) to control how
+        the image is saved and ``size`` ((width, height), default the LAYOUT
+        size) to draw at another resolution.
+        """
         self.data = data
         self.output_path = output_path
         self.week_label = week_label
-        self.width = self.LAYOUT["width"]
-        self.height = self.LAYOUT["height"]
+        self.encoder = encoder or ENCODER_PRESETS["default"]
+        self.width, self.height = size or (self.LAYOUT["width"], self.LAYOUT["height"])
+        # Fit the layout into the image; extra width goes to the cards
+        self.scale = min(self.width / self.LAYOUT["width"], self.height / self.LAYOUT["height"])
+        self.layout = {key: self.px(value) for key, value in self.LAYOUT.items()}
 
         # Create image and drawing context
         self.img = Image.new("RGB", (self.width, self.height), color=self.COLORS["background"])
         self.draw = ImageDraw.Draw(self.img)
 
         # Load fonts
-        self.fonts = self._load_fonts()
+        self.fonts = fonts if fonts is not None else self._load_fonts(self.scale)
 
-    def _load_fonts(self):
-        """Load fonts with fallbacks if needed."""
-        # Get the directory where this script is located
-        current_dir = os.path.dirname(os.path.abspath(__file__))
-
-        # Try different possible paths for the assets folder
-        possible_asset_paths = [
-            # If running from src/ directory, assets is one level up
-            os.path.join(current_dir, "../assets/fonts/Poppins"),
-            # If assets is at the same level as src
-            os.path.join(current_dir, "../assets/fonts"),
-            # If running from project root
-            os.path.join(current_dir, "assets/fonts/Poppins"),
-            # Direct path based on your file structure
-            os.path.abspath(os.path.join(current_dir, "../assets/fonts/Poppins")),
-        ]
-
-        # Find the correct assets path
-        assets_path = None
-        for path in possible_asset_paths:
-            if os.path.exists(path):
-                assets_path = path
-                break
+    def px(self, length):
+        """A length of the LAYOUT-sized design in pixels of this image."""
+        return round(length * self.scale)
 
-        if assets_path is None:
-            print("Warning: Could not find Poppins fonts directory.")
-            print("Searched paths:")
-            for path in possible_asset_paths:
-                print(f"  - {path}")
-            return self._get_default_fonts()
-
-        # Define font files
-        font_files = {
-            "title": "Poppins-Bold.ttf",
-            "header": "Poppins-SemiBold.ttf",
-            "text": "Poppins-Medium.ttf",
-            "value": "Poppins-Bold.ttf",
-            "label": "Poppins-Regular.ttf"
-        }
+    @classmethod
+    def load_fonts(cls, scale=1.0):
+        """Load the fonts once so they can be shared by several images of the same scale."""
+        return cls._load_fonts(scale)
 
-        # Define font sizes
-        font_sizes = {
-            "title": 90,
-            "header": 65,
-            "text": 34,
-            "value": 50,
-            "label": 28
-        }
+    @classmethod
+    def _load_fonts(cls, scale=1.0):
+        """Load fonts with fallbacks if needed."""
+        assets_path = _find_fonts_dir()
+        if assets_path is None:
+            return cls._get_default_fonts(scale)
 
         fonts = {}
-        for name, filename in font_files.items():
+        for name, filename in cls.FONT_FILES.items():
             font_path = os.path.join(assets_path, filename)
+            size = max(1, round(cls.FONT_SIZES[name] * scale))
             try:
-                if os.path.exists(font_path):
-                    fonts[name] = ImageFont.truetype(font_path, font_sizes[name])
-                    # Removed: print(f"Loaded {name} font from: {font_path}")
-                else:
-                    print(f"Warning: Font file not found: {font_path}")
-                    # Use a working TrueType font as fallback
-                    fonts[name] = self._get_fallback_font(font_sizes[name])
-            except Exception as e:
+                fonts[name] = get_font(font_path, size)
+            except OSError as e:
                 print(f"Warning: Could not load {name} font from {font_path}: {e}")
-                fonts[name] = self._get_fallback_font(font_sizes[name])
+                fonts[name] = cls._get_fallback_font(size)
 
         return fonts
 
-    def _get_fallback_font(self, size):
+    @staticmethod
+    def _get_fallback_font(size):
         """Get a working fallback TrueType font."""
-        # Common system font paths on Linux/Unix systems
-        common_fonts = [
-            "/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf",
-            "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf",
-            "/usr/share/fonts/truetype/liberation/LiberationSans-Bold.ttf",
-            "/usr/share/fonts/truetype/liberation/LiberationSans-Regular.ttf",
-            "/System/Library/Fonts/Arial.ttf",  # macOS
-            "/System/Library/Fonts/Helvetica.ttc",  # macOS
-            "C:/Windows/Fonts/arial.ttf",  # Windows
-            "C:/Windows/Fonts/calibri.ttf",  # Windows
-        ]
-
-        for font_path in common_fonts:
-            if os.path.exists(font_path):
-                try:
-                    return ImageFont.truetype(font_path, size)
-                except Exception:
-                    continue
-
-        # If no system font works, create a minimal TrueType font
-        print(f"Warning: Using default font with size {size}")
+        font_path = _find_fallback_font()
+        if font_path is not None:
+            return get_font(font_path, size)
+
+        # If no system font works, use Pillow's built-in font
         try:
-            # Try to load default but with a specific size
             return ImageFont.load_default()
         except Exception:
             # Last resort - return None and handle in drawing methods
             return None
 
-    def _get_default_fonts(self):
+    @classmethod
+    def _get_default_fonts(cls, scale=1.0):
         """Get default fonts when Poppins fonts are not available."""
-        print("Using fallback fonts...")
-        return {
-            "title": self._get_fallback_font(105),
-            "header": self._get_fallback_font(65),
-            "text": self._get_fallback_font(34),
-            "value": self._get_fallback_font(50),
-            "label": self._get_fallback_font(28)
-        }
+        sizes = {"title": 105, "header": 65, "text": 34, "value": 50, "label": 28}
+        return {name: cls._get_fallback_font(max(1, round(size * scale))) for name, size in sizes.items()}
 
     @staticmethod
     def draw_rounded_rectangle(draw, xy, radius=10, fill=None):
@@ -156,96 +302,150 @@ class StravaStatsImage:
         draw.pieslice((x1, y2 - 2 * radius, x1 + 2 * radius, y2), 90, 180, fill=fill)
         draw.pieslice((x2 - 2 * radius, y2 - 2 * radius, x2, y2), 0, 90, fill=fill)
 
+    def draw_text(self, xy, text, font, fill):
+        """
+        Draw text that repeats across images (labels, titles, badges) by
+        pasting its cached rasterisation; the pixels match draw.text.
+        """
+        try:
+            mask, (left, top) = text_mask(text, font)
+        except Exception:
+            # Fonts without bbox support are drawn directly
+            self.draw.text(xy, text, font=font, fill=fill)
+            return
+        if mask is not None:
+            self.img.paste(fill, (int(xy[0]) + left, int(xy[1]) + top), mask)
+
     def draw_stat(self, x, y, value, label, center=False):
         """Draw a stat with value and label."""
-        # Draw the value
+        value = str(value)
         value_font = self.fonts["value"] if self.fonts["value"] else ImageFont.load_default()
         label_font = self.fonts["label"] if self.fonts["label"] else ImageFont.load_default()
 
-        self.draw.text((x, y), str(value), font=value_font, fill=self.COLORS["text"])
-
-        # Calculate value text dimensions
+        # Lay out first: each text is measured once (labels once per process)
         try:
-            value_bbox = self.draw.textbbox((x, y), str(value), font=value_font)
+            value_bbox = text_bbox(value, value_font)
             value_width = value_bbox[2] - value_bbox[0]
             value_height = value_bbox[3] - value_bbox[1]
         except Exception:
             # Fallback for text sizing
-            value_width = len(str(value)) * 20
-            value_height = 30
+            value_width = len(value) * self.px(20)
+            value_height = self.px(30)
 
-        # Draw the label
         label_x = x
         if center:
             try:
-                label_bbox = self.draw.textbbox((0, 0), label, font=label_font)
+                label_bbox = text_bbox(label, label_font)
                 label_width = label_bbox[2] - label_bbox[0]
                 label_x = x + (value_width - label_width) // 2
             except Exception:
                 # Fallback positioning
                 label_x = x
 
-        self.draw.text((label_x, y + value_height + 18), label, font=label_font, fill=self.COLORS["text"])
-
-    def _draw_header(self, current_y):
-        """Draw the header section with accent line and title."""
-        margin = self.LAYOUT["margin"]
-
-        # Draw accent line above the title
-        line_width = 120
-        line_height = 8
-        self.draw.rectangle(
-            [(margin, current_y - 20), (margin + line_width, current_y - 20 + line_height)],
-            fill=self.COLORS["accent"]
-        )
-
-        current_y += 30
+        # Values change from card to card, labels do not
+        self.draw.text((x, y), value, font=value_font, fill=self.COLORS["text"])
+        self.draw_text((label_x, y + value_height + self.px(18)), label, label_font, self.COLORS["text"])
 
-        # Draw title
-        title_text = self.week_label.upper()
+    def _layout_header(self, current_y):
+        """Measure the title and return (title_y, y where the cards start)."""
+        title_y = current_y + self.px(30)
         title_font = self.fonts["title"] if self.fonts["title"] else ImageFont.load_default()
-        self.draw.text((margin, current_y), title_text, font=title_font, fill=self.COLORS["text"])
 
         try:
-            bbox = self.draw.textbbox((margin, current_y), title_text, font=title_font)
+            bbox = text_bbox(self.week_label.upper(), title_font)
             title_height = bbox[3] - bbox[1]
         except Exception:
-            title_height = 100  # Fallback height
+            title_height = self.px(100)  # Fallback height
+
+        return title_y, title_y + title_height + self.px(90)
 
-        return current_y + title_height + 90
+    def _draw_accent_line(self, current_y):
+        """Draw the accent line above the title."""
+        margin = self.layout["margin"]
+        line_width = self.px(120)
+        line_height = self.px(8)
+        self.draw.rectangle(
+            [(margin, current_y - self.px(20)), (margin + line_width, current_y - self.px(20) + line_height)],
+            fill=self.COLORS["accent"]
+        )
 
-    def _draw_card(self, title, content_callback, current_y, height):
-        """Draw a card with title and content."""
-        margin = self.LAYOUT["margin"]
-        card_padding = self.LAYOUT["card_padding"]
-        card_radius = self.LAYOUT["card_radius"]
+    def _draw_header(self, title_y):
+        """Draw the title text."""
+        title_font = self.fonts["title"] if self.fonts["title"] else ImageFont.load_default()
+        self.draw_text((self.layout["margin"], title_y), self.week_label.upper(),
+                       title_font, self.COLORS["text"])
 
-        # Calculate card dimensions
+    def _draw_card_background(self, title, current_y, height):
+        """Draw a card's rounded background and title."""
+        margin = self.layout["margin"]
+        card_padding = self.layout["card_padding"]
         card_width = self.width - (2 * margin)
 
-        # Draw the card background
         self.draw_rounded_rectangle(
             self.draw,
             (margin, current_y, margin + card_width, current_y + height),
-            radius=card_radius,
+            radius=self.layout["card_radius"],
             fill=self.COLORS["secondary"]
         )
 
-        # Card title
-        card_title_y = current_y + card_padding
-        card_content_y = card_title_y + 110
         header_font = self.fonts["header"] if self.fonts["header"] else ImageFont.load_default()
-        self.draw.text(
-            (margin + card_padding, card_title_y),
+        self.draw_text(
+            (margin + card_padding, current_y + card_padding),
             title,
-            font=header_font,
-            fill=self.COLORS["accent"]
+            header_font,
+            self.COLORS["accent"]
         )
 
-        # Draw card content using the callback
+    def _draw_card(self, content_callback, current_y):
+        """Draw a card's content; the background comes from the static layer."""
+        margin = self.layout["margin"]
+        card_padding = self.layout["card_padding"]
+        card_width = self.width - (2 * margin)
+        card_content_y = current_y + card_padding + self.px(110)
+
         content_callback(margin, card_padding, card_width, card_content_y)
 
-        return current_y + height + 50
+        return current_y + self.px(self.CARD_HEIGHT) + self.px(self.CARD_SPACING)
+
+    def _draw_badge(self, text, current_y):
+        """Draw a pill badge (e.g. a personal record) in a card's top-right corner."""
+        margin = self.layout["margin"]
+        card_padding = self.layout["card_padding"]
+        badge_font = self.fonts["label"] if self.fonts["label"] else ImageFont.load_default()
+        pad_x, pad_y = self.px(24), self.px(12)
+
+        try:
+            bbox = text_bbox(text, badge_font)
+            text_width, text_height = bbox[2] - bbox[0], bbox[3] - bbox[1]
+            offset_x, offset_y = bbox[0], bbox[1]
+        except Exception:
+            text_width, text_height = len(text) * self.px(16), self.px(28)
+            offset_x = offset_y = 0
+
+        right = self.width - margin - card_padding
+        top = current_y + card_padding + self.px(10)
+        left = right - text_width - 2 * pad_x
+        bottom = top + text_height + 2 * pad_y
+        self.draw_rounded_rectangle(
+            self.draw, (left, top, right, bottom),
+            radius=(bottom - top) // 2, fill=self.COLORS["accent"]
+        )
+        self.draw_text((left + pad_x - offset_x, top + pad_y - offset_y), text,
+                       badge_font, self.COLORS["text"])
+
+    def _draw_route(self, points, current_y):
+        """Draw a route thumbnail (pixel points inside ROUTE_SIZE, scaled with the image) in a run card."""
+        margin = self.layout["margin"]
+        card_padding = self.layout["card_padding"]
+        grid_width = (self.width - 2 * margin - 2 * card_padding) // 2
+        left = margin + card_padding + grid_width
+        top = current_y + card_padding + self.px(110 + 130)  # Bottom row of the card grid
+
+        line = [(left + self.px(x), top + self.px(y)) for x, y in points]
+        self.draw.line(line, fill=self.COLORS["accent"], width=max(1, self.px(5)), joint="curve")
+        start_x, start_y = line[0]
+        dot = self.px(7)
+        self.draw.ellipse((start_x - dot, start_y - dot, start_x + dot, start_y + dot), fill=self.COLORS["text"])
 
     def _draw_summary_card(self, margin, card_padding, card_width, content_y):
         """Draw the summary statistics card content."""
@@ -253,11 +453,11 @@ class StravaStatsImage:
 
         # Grid dimensions
         grid_width = (card_width - (2 * card_padding)) // 2
-        grid_height = 150  # Approximate height for each grid item
+        grid_height = self.px(150)  # Approximate height for each grid item
 
         # Total runs - bottom right
         self.draw_stat(
-            margin + card_padding + grid_width, content_y + grid_height - 20,
+            margin + card_padding + grid_width, content_y + grid_height - self.px(20),
             str(summary.get('total_runs', 0)), "Runs"
         )
 
@@ -275,7 +475,7 @@ class StravaStatsImage:
 
         # Average pace - bottom left
         self.draw_stat(
-            margin + card_padding, content_y + grid_height - 20,
+            margin + card_padding, content_y + grid_height - self.px(20),
             summary.get('average_pace', '0:00'), "avg Pace"
         )
 
@@ -283,17 +483,17 @@ class StravaStatsImage:
         """Draw either the longest or fastest run card content."""
         if not run_data:
             text_font = self.fonts["text"] if self.fonts["text"] else ImageFont.load_default()
-            self.draw.text(
+            self.draw_text(
                 (margin + card_padding, content_y),
                 "No run data available",
-                font=text_font,
-                fill=self.COLORS["text"]
+                text_font,
+                self.COLORS["text"]
             )
             return
 
         # Grid dimensions
         grid_width = (card_width - (2 * card_padding)) // 2
-        grid_height = 150  # Match the same grid height as summary card
+        grid_height = self.px(150)  # Match the same grid height as summary card
 
         # Distance - top left
         self.draw_stat(
@@ -309,77 +509,263 @@ class StravaStatsImage:
 
         # Pace - bottom left (to match summary card grid layout)
         self.draw_stat(
-            margin + card_padding, content_y + grid_height - 20,
+            margin + card_padding, content_y + grid_height - self.px(20),
             run_data.pace_str, "Pace"
         )
 
     def _draw_watermark(self):
         """Draw the watermark at the bottom of the image."""
-        watermark_text = "WEEKLY RUNNING STATS"
+        watermark_text = self.WATERMARK
         watermark_font = self.fonts["label"] if self.fonts["label"] else ImageFont.load_default()
 
         try:
-            watermark_bbox = self.draw.textbbox((0, 0), watermark_text, font=watermark_font)
+            watermark_bbox = text_bbox(watermark_text, watermark_font)
             watermark_width = watermark_bbox[2] - watermark_bbox[0]
         except Exception:
-            watermark_width = len(watermark_text) * 10  # Fallback width calculation
+            watermark_width = len(watermark_text) * self.px(10)  # Fallback width calculation
 
-        self.draw.text(
-            (self.width // 2 - watermark_width // 2, self.height - self.LAYOUT["margin"]),
+        self.draw_text(
+            (self.width // 2 - watermark_width // 2, self.height - self.layout["margin"]),
             watermark_text,
-            font=watermark_font,
-            fill=self.COLORS["watermark"]
+            watermark_font,
+            self.COLORS["watermark"]
         )
 
-    def generate(self):
-        """Generate the complete Strava stats image."""
-        # Start layout from top margin
-        current_y = self.LAYOUT["margin"] + 40
-
-        # Draw header section
-        current_y = self._draw_header(current_y)
-
-        # Draw fastest run card
-        fastest_run = self.data.get("fastest_run")
-        current_y = self._draw_card(
-            "FASTEST RUN",
-            lambda m, p, w, y: self._draw_run_card(fastest_run, m, p, w, y),
-            current_y,
-            450  # Same height as summary card
-        )
+    def _draw_static_layer(self, header_y, cards_y):
+        """Draw everything that does not depend on the stats data."""
+        self._draw_accent_line(header_y)
 
-        # Draw longest run card
-        longest_run = self.data.get("longest_run")
-        current_y = self._draw_card(
-            "LONGEST RUN",
-            lambda m, p, w, y: self._draw_run_card(longest_run, m, p, w, y),
-            current_y,
-            450  # Same height as summary card
-        )
+        current_y = cards_y
+        for title, _ in self.CARDS:
+            self._draw_card_background(title, current_y, self.px(self.CARD_HEIGHT))
+            current_y += self.px(self.CARD_HEIGHT) + self.px(self.CARD_SPACING)
+
+        self._draw_watermark()
 
-        # Draw summary card
-        current_y = self._draw_card(
-            "SUMMARY",
-            self._draw_summary_card,
-            current_y,
-            450  # Fixed height for summary card
+    def _get_template(self, header_y, cards_y):
+        """Get the static layer for this layout, rendering it on first use."""
+        key = (
+            type(self), self.width, self.height, tuple(self.COLORS.items()),
+            tuple(id(font) for font in self.fonts.values()), header_y, cards_y
+        )
+        template = self._template_cache.get(key)
+        if template is None:
+            self.img = Image.new("RGB", (self.width, self.height), color=self.COLORS["background"])
+            self.draw = ImageDraw.Draw(self.img)
+            self._draw_static_layer(header_y, cards_y)
+            template = self.img
+            if len(self._template_cache) >= self.TEMPLATE_CACHE_SIZE:
+                self._template_cache.pop(next(iter(self._template_cache)))
+            self._template_cache[key] = template
+        return template
+
+    @classmethod
+    def cache_key(cls, data, week_label, encoder=None, extension="png", size=None):
+        """Digest of everything that determines the encoded image's bytes (size: an OUTPUT_SIZES name)."""
+        from src.render_cache import content_digest
+
+        return content_digest(
+            cls.RENDER_VERSION, cls.__name__, data, str(week_label), cls.COLORS, cls.LAYOUT,
+            cls.FONT_FILES, cls.FONT_SIZES, _find_fonts_dir(),
+            encoder or ENCODER_PRESETS["default"], extension,
+            cls.OUTPUT_SIZES[size or cls.DEFAULT_SIZE], cls.size_source(size or cls.DEFAULT_SIZE)
         )
 
-        # Add watermark
-        self._draw_watermark()
+    @classmethod
+    def size_source(cls, name):
+        """The larger output size with the same aspect ratio a size is downscaled from, or None if it is drawn."""
+        width, height = cls.OUTPUT_SIZES[name]
+        larger = [other for other, (w, h) in cls.OUTPUT_SIZES.items() if w * height == h * width and w > width]
+        return max(larger, key=lambda other: cls.OUTPUT_SIZES[other][0]) if larger else None
+
+    @classmethod
+    def size_family(cls, name):
+        """The sizes rendered from the same drawn image as a size: its source and every size downscaled from it."""
+        source = cls.size_source(name) or name
+        return [other for other in cls.OUTPUT_SIZES if (cls.size_source(other) or other) == source]
+
+    @classmethod
+    def render_sizes(cls, data, week_label, outputs, encoder=None, fonts=None):
+        """
+        Render one card in several named output sizes.
+
+        Every drawn size is laid out and drawn once; sizes sharing the aspect
+        ratio of a larger size are downscaled from its render (drawing that
+        size too if it was not requested).
+
+        Args:
+            data: Processed stats data
+            week_label: Title of the card
+            outputs: Mapping of size name (OUTPUT_SIZES) to output path
+            encoder: Encoder options the images are saved with
+            fonts: Fonts for the LAYOUT size, as returned by load_fonts()
+
+        Returns:
+            Dict of size name to rendered (unsaved) image, for the requested sizes
+
+        Raises:
+            ValueError: If a size name is unknown
+        """
+        unknown = [name for name in outputs if name not in cls.OUTPUT_SIZES]
+        if unknown:
+            raise ValueError(f"Unknown size: {', '.join(unknown)}. Use one of {', '.join(cls.OUTPUT_SIZES)}.")
+
+        layout_size = (cls.LAYOUT["width"], cls.LAYOUT["height"])
+
+        def create(name):
+            size = cls.OUTPUT_SIZES[name]
+            return cls(data, outputs.get(name), week_label, fonts=fonts if size == layout_size else None,
+                       encoder=encoder, size=size)
+
+        drawn = {}
+
+        def draw(name):
+            if name not in drawn:
+                image = drawn[name] = create(name)
+                with profiling.stage("render", image=cls.__name__, size=name):
+                    image.render()
+            return drawn[name]
+
+        images = {}
+        for name in outputs:
+            source = cls.size_source(name)
+            if source is None:
+                images[name] = draw(name)
+                continue
+            source_img = draw(source).img
+            image = images[name] = create(name)
+            with profiling.stage("downscale", size=name):
+                factor, remainder = divmod(source_img.width, image.width)
+                if remainder == 0:
+                    # Box-averaging integer reduction: several times faster than resampling
+                    image.img = source_img.reduce(factor)
+                else:
+                    image.img = source_img.resize((image.width, image.height), Image.Resampling.LANCZOS,
+                                                  reducing_gap=2.0)
+            image.draw = ImageDraw.Draw(image.img)
+        return images
+
+    @classmethod
+    def generate_sizes(cls, data, week_label, outputs, encoder=None, fonts=None):
+        """Render one card in several named sizes (see render_sizes) and save each to its path."""
+        for name, image in cls.render_sizes(data, week_label, outputs, encoder, fonts).items():
+            with profiling.stage("encode", size=name, format=image.encoder.format or "auto"):
+                image.save()
+            print(f"Image saved to {image.output_path}")
+
+    def save(self):
+        """Encode the rendered image to the output path."""
+        img = self.img
+        if self.encoder.colors:
+            img = img.quantize(colors=self.encoder.colors, method=Image.Quantize.FASTOCTREE)
+            if (self.encoder.format or "").upper() == "JPEG":
+                img = img.convert("RGB")
+        img.save(self.output_path, **self.encoder.save_kwargs())
+
+    def render(self):
+        """Lay out and draw the image without saving it."""
+        # Start layout from top margin
+        header_y = self.layout["margin"] + self.px(40)
+        with profiling.stage("layout"):
+            title_y, cards_y = self._layout_header(header_y)
+
+        # Start from the cached background, card chrome and watermark
+        with profiling.stage("template"):
+            self.img = self._get_template(header_y, cards_y).copy()
+            self.draw = ImageDraw.Draw(self.img)
+
+        # Draw header title
+        with profiling.stage("draw.header"):
+            self._draw_header(title_y)
+
+        # Draw the card contents
+        badges = self.data.get("badges", {})
+        routes = self.data.get("routes", {})
+        current_y = cards_y
+        for _, key in self.CARDS:
+            with profiling.stage(f"draw.{key or 'summary'}"):
+                if badges.get(key):
+                    self._draw_badge(badges[key], current_y)
+                if routes.get(key):
+                    self._draw_route(routes[key], current_y)
+                if key is None:
+                    current_y = self._draw_card(self._draw_summary_card, current_y)
+                else:
+                    run_data = self.data.get(key)
+                    current_y = self._draw_card(
+                        lambda m, p, w, y: self._draw_run_card(run_data, m, p, w, y),
+                        current_y
+                    )
+
+    def generate(self):
+        """Generate the complete Strava stats image."""
+        with profiling.stage("render", image=type(self).__name__):
+            self.render()
 
         # Save the generated image
-        self.img.save(self.output_path)
+        with profiling.stage("encode", format=self.encoder.format or "auto"):
+            self.save()
         print(f"Image saved to {self.output_path}")
 
 
-def generate_strava_stats_image(data, output_path="strava_stats.png", week_label="WEEKLY STATS"):
+def generate_strava_stats_image(data, output_path="strava_stats.png", week_label="WEEKLY STATS",
+                                encoder=None, cache=None, fonts=None):
     """
     Legacy wrapper function that maintains backward compatibility with the original code.
     Creates and generates a Strava stats image.
+
+    With a RenderCache, an image whose data, label, theme, size and encoder
+    settings match a previous render is copied from the cache instead.
+    """
+    generate_strava_stats_images(data, {StravaStatsImage.DEFAULT_SIZE: output_path}, week_label,
+                                 encoder, cache, fonts)
+
+
+def generate_strava_stats_images(data, outputs, week_label="WEEKLY STATS", encoder=None, cache=None,
+                                 fonts=None):
     """
-    image_generator = StravaStatsImage(data, output_path, week_label)
-    image_generator.generate()
+    Generate a Strava stats image in several sizes from one set of data.
+
+    Args:
+        data: Processed stats data
+        outputs: Mapping of size name (StravaStatsImage.OUTPUT_SIZES) to output path
+        week_label: Title of the image
+        encoder: Encoder options
+        cache: Render cache; sizes that match a previous render are copied from it
+        fonts: Fonts for the default size, as returned by StravaStatsImage.load_fonts()
+    """
+    if cache is not None:
+        outputs = fetch_cached_images(data, outputs, week_label, encoder, cache)
+        if not outputs:
+            return
+
+    StravaStatsImage.generate_sizes(data, week_label, outputs, encoder, fonts)
+
+    if cache is not None:
+        for name, output_path in outputs.items():
+            cache.put(*_cache_entry(data, output_path, week_label, encoder, name), output_path)
+
+
+def _cache_entry(data, output_path, week_label, encoder, size=None):
+    """(digest, extension) under which an image is stored in the render cache."""
+    extension = os.path.splitext(str(output_path))[1].lstrip(".").lower() or "png"
+    return StravaStatsImage.cache_key(data, week_label, encoder, extension, size), extension
+
+
+def fetch_cached_image(data, output_path, week_label, encoder, cache, size=None):
+    """Copy a matching cached render to output_path; returns False on a miss."""
+    if cache.fetch(*_cache_entry(data, output_path, week_label, encoder, size), output_path):
+        print(f"Image unchanged, reused cached render for {output_path}")
+        return True
+    return False
+
+
+def fetch_cached_images(data, outputs, week_label, encoder, cache):
+    """Copy the cached renders of every size that has one; returns the outputs still to render."""
+    return {
+        name: output_path for name, output_path in outputs.items()
+        if not fetch_cached_image(data, output_path, week_label, encoder, cache, name)
+    }
 
 
 if __name__ == "__main__":
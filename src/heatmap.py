@@ -0,0 +1,182 @@
+"""
+Year-in-review heatmap for RunDown - a calendar grid of daily distance with
+monthly totals.
+
+The day grid is built as a byte array of palette indices and blitted in one
+operation (scaled with nearest-neighbour, gaps masked in one paste) instead of
+drawing a rectangle per day.
+"""
+
+from bisect import bisect_right
+from datetime import date, timedelta
+from functools import lru_cache
+from typing import Dict, Iterable, List, Tuple
+
+from PIL import Image, ImageDraw, ImageFont
+
+from src import profiling
+from src.generate_image import StravaStatsImage
+from src.training_load import TrainingLoad
+
+# Number of colour steps for days with runs, split at quantiles of the active days
+LEVELS = 4
+
+
+def heatmap_data(activities: Iterable, start_date, end_date) -> Dict:
+    """
+    Daily run distances for a date range, as the data of a YearHeatmapImage.
+
+    Args:
+        activities: Iterable of stravalib activities or run records
+        start_date: First day of the heatmap
+        end_date: Last day of the heatmap
+
+    Returns:
+        Dict with the first day, daily distances in km and the number of runs
+    """
+    load = TrainingLoad.from_runs(activities, start_date, end_date)
+    return {
+        "start": load.first_day.isoformat(),
+        "daily_km": [round(distance / 1000, 2) for distance in load.daily("distance")],
+        "runs": sum(load.daily("runs")),
+    }
+
+
+@lru_cache(maxsize=8)
+def _gap_mask(columns: int, rows: int, cell: int, gap: int) -> Image.Image:
+    """Mask that is opaque on the gaps between (and after) the grid cells."""
+    pitch = cell + gap
+    cell_row = (b"\x00" * cell + b"\xff" * gap) * columns
+    gap_row = b"\xff" * (columns * pitch)
+    data = (cell_row * cell + gap_row * gap) * rows
+    return Image.frombytes("L", (columns * pitch, rows * pitch), data)
+
+
+class YearHeatmapImage(StravaStatsImage):
+    """Calendar heatmap of daily distance (weeks as columns, Monday on top) with monthly totals."""
+
+    LAYOUT = {**StravaStatsImage.LAYOUT, "height": 1080}
+    WATERMARK = "YEAR IN RUNNING"
+    # The grid is drawn at the LAYOUT size only; the thumbnail is downscaled from it
+    OUTPUT_SIZES = {
+        "square": (1080, 1080),
+        "thumbnail": (270, 270),
+    }
+    DEFAULT_SIZE = "square"
+    CELL_SIZE = 15
+    CELL_GAP = 3
+    BAR_HEIGHT = 200
+
+    def _palette(self) -> List[int]:
+        """Palette: 0 background (outside the range), 1 rest day, then LEVELS accent steps."""
+        background, empty, accent = self.COLORS["background"], self.COLORS["secondary"], self.COLORS["accent"]
+        colors = [background, empty]
+        for level in range(1, LEVELS + 1):
+            t = 0.25 + 0.75 * level / LEVELS
+            colors.append(tuple(round(e + (a - e) * t) for e, a in zip(empty, accent)))
+        return [channel for color in colors for channel in color]
+
+    @staticmethod
+    def _thresholds(daily_km: List[float]) -> List[float]:
+        """Distances splitting the active days into LEVELS equally sized groups."""
+        active = sorted(km for km in daily_km if km > 0)
+        if not active:
+            return []
+        return [active[len(active) * step // LEVELS] for step in range(1, LEVELS)]
+
+    def _grid(self, first_day: date, daily_km: List[float]) -> Tuple[Image.Image, int]:
+        """The day grid as a scaled palette image, and its number of week columns."""
+        offset = first_day.weekday()
+        columns = (offset + len(daily_km) + 6) // 7
+        thresholds = self._thresholds(daily_km)
+
+        cells = bytearray(7 * columns)
+        for i, km in enumerate(daily_km):
+            column, row = divmod(offset + i, 7)
+            cells[row * columns + column] = 1 if km <= 0 else 2 + bisect_right(thresholds, km)
+
+        grid = Image.frombytes("P", (columns, 7), bytes(cells))
+        grid.putpalette(self._palette())
+        pitch = self.CELL_SIZE + self.CELL_GAP
+        return grid.resize((columns * pitch, 7 * pitch), Image.Resampling.NEAREST).convert("RGB"), columns
+
+    @staticmethod
+    def _monthly_totals(first_day: date, daily_km: List[float]) -> List[Tuple[date, float]]:
+        """(first of month, km) for every month the range touches."""
+        totals = {}
+        for i, km in enumerate(daily_km):
+            day = first_day + timedelta(days=i)
+            month = day.replace(day=1)
+            totals[month] = totals.get(month, 0.0) + km
+        return list(totals.items())
+
+    def _draw_summary(self, y, daily_km):
+        margin = self.layout["margin"]
+        column_width = (self.width - 2 * margin) // 3
+        stats = (
+            (f"{round(sum(daily_km), 1)} KM", "Total Distance"),
+            (str(self.data.get("runs", 0)), "Runs"),
+            (str(sum(1 for km in daily_km if km > 0)), "Active Days"),
+        )
+        for i, (value, label) in enumerate(stats):
+            self.draw_stat(margin + i * column_width, y, value, label)
+
+    def _draw_month_bars(self, top, months):
+        """Draw one bar per month, scaled to the biggest month, with km above and month below."""
+        margin = self.layout["margin"]
+        label_font = self.fonts["label"] if self.fonts["label"] else ImageFont.load_default()
+        slot = (self.width - 2 * margin) / len(months)
+        bar_width = max(4, int(slot * 0.6))
+        most = max(km for _, km in months) or 1
+        bottom = top + self.BAR_HEIGHT
+
+        for i, (month, km) in enumerate(months):
+            x = round(margin + i * slot + (slot - bar_width) / 2)
+            height = round(self.BAR_HEIGHT * km / most)
+            if height:
+                self.draw.rectangle((x, bottom - height, x + bar_width, bottom), fill=self.COLORS["accent"])
+            center = x + bar_width / 2
+            self.draw.text((center, bottom - height - 10), f"{km:.0f}", font=label_font,
+                           fill=self.COLORS["text"], anchor="ms")
+            self.draw.text((center, bottom + 14), month.strftime("%b")[0], font=label_font,
+                           fill=self.COLORS["text"], anchor="mt")
+
+    def render(self):
+        """Lay out and draw the heatmap without saving it."""
+        first_day = date.fromisoformat(self.data["start"])
+        daily_km = self.data.get("daily_km", [])
+        margin = self.layout["margin"]
+        label_font = self.fonts["label"] if self.fonts["label"] else ImageFont.load_default()
+
+        self.img = Image.new("RGB", (self.width, self.height), color=self.COLORS["background"])
+        self.draw = ImageDraw.Draw(self.img)
+
+        header_y = margin + 40
+        with profiling.stage("draw.header"):
+            title_y, content_y = self._layout_header(header_y)
+            self._draw_accent_line(header_y)
+            self._draw_header(title_y)
+            self._draw_summary(content_y, daily_km)
+
+        # Day grid, centred, with month names above the column of each month's first day
+        with profiling.stage("draw.grid", days=len(daily_km)):
+            grid, columns = self._grid(first_day, daily_km)
+            pitch = self.CELL_SIZE + self.CELL_GAP
+            grid_x = (self.width - grid.width + self.CELL_GAP) // 2
+            grid_y = content_y + 190
+            self.img.paste(grid, (grid_x, grid_y))
+            self.img.paste(self.COLORS["background"],
+                           (grid_x, grid_y, grid_x + grid.width, grid_y + grid.height),
+                           _gap_mask(columns, 7, self.CELL_SIZE, self.CELL_GAP))
+
+        with profiling.stage("draw.months"):
+            months = self._monthly_totals(first_day, daily_km)
+            offset = first_day.weekday()
+            for month, _ in months:
+                column = (offset + max((month - first_day).days, 0)) // 7
+                self.draw.text((grid_x + column * pitch, grid_y - 12), month.strftime("%b"),
+                               font=label_font, fill=self.COLORS["watermark"], anchor="ls")
+
+            if months:
+                self._draw_month_bars(grid_y + grid.height + 110, months)
+            self._draw_watermark()
@@ -8,10 +8,452 @@ import argparse
 import sys
 from pathlib import Path
 
-from src.auth import authenticate_strava
-from src.run_data_processor import RunDataProcessor
-from src.generate_image import generate_strava_stats_image
-from src.date_utils import get_week_range, parse_date_input
+# Heavy dependencies (stravalib, Pillow, sqlite3) are imported inside the
+# stage that needs them so --help and argument errors return immediately.
+from src import profiling
+from src.date_utils import get_week_range, iter_week_ranges, parse_date_input
+
+
+def connect(args):
+    """Authenticate with Strava and return the client used for fetching."""
+    from src.auth import authenticate_strava
+
+    with profiling.stage("auth"):
+        client = authenticate_strava()
+    return fetch_client(args, client)
+
+
+def fetch_client(args, client, token=None):
+    """
+    The client activities are fetched with: the concurrent one with --async-fetch.
+
+    ``token`` is the access-token callback for --async-fetch (default: one
+    refreshing the .env tokens of ``client``, see auth.token_provider).
+    """
+    if args.async_fetch:
+        from src.async_client import AsyncFetchClient
+        if token is None:
+            from src.auth import token_provider
+            token = token_provider(client)
+        return AsyncFetchClient(token, concurrency=args.fetch_concurrency)
+    return profiling.instrument_client(client)
+
+
+def iter_activities(client, args, start_date, end_date, cache=None):
+    """
+    Stream the activities in a date range, through the local store unless disabled.
+
+    ``cache`` overrides the store path from --cache (one store per athlete).
+
+    The store is synced before this returns, so the sync is profiled as its
+    own stage rather than inside whichever stage first reads the activities.
+    Activities are then yielded one at a time straight from the paginated API
+    iterator or the database cursor, so callers can fold them without ever
+    holding the whole range in memory.
+    """
+    from src.activity_store import ActivityStore
+    from src.run_record import RunRecord
+
+    if args.no_cache:
+        # Project each model into a slotted record as it arrives
+        return (RunRecord.from_activity(activity)
+                for activity in client.get_activities(after=start_date, before=end_date))
+
+    store = ActivityStore(cache or args.cache)
+    try:
+        with profiling.stage("sync"):
+            synced = store.sync(client, start_date, end_date)
+    except BaseException:
+        store.close()
+        raise
+    if synced == 0:
+        print("Using cached activities")
+    return _iter_store_runs(store, start_date, end_date)
+
+
+def _iter_store_runs(store, start_date, end_date):
+    """Yield a store's runs in a range, closing the store once they are consumed."""
+    with store:
+        yield from store.iter_runs(start_date, end_date)
+
+
+def accumulate_by_week(activities):
+    """Fold runs into one accumulator per Monday-Sunday week, keyed by the week's Monday."""
+    from src.run_data_processor import RunAccumulator
+
+    weeks = {}
+    for activity in activities:
+        if activity.type != 'Run':
+            continue
+        monday_start, _ = get_week_range(activity.start_date)
+        weeks.setdefault(monday_start, RunAccumulator()).add(activity)
+    return weeks
+
+
+def add_record_badges(args, cards, cache=None):
+    """
+    Attach personal-record badges from the activity store's index to card data.
+
+    Args:
+        args: Parsed arguments (no badges with --no-cache, as there is no index)
+        cards: Iterable of (accumulator, processed_data) pairs
+        cache: Store path overriding --cache
+    """
+    if args.no_cache:
+        return
+    from src.activity_store import ActivityStore
+
+    with profiling.stage("records"), ActivityStore(cache or args.cache) as store:
+        for accumulator, data in cards:
+            badges = store.records.badges(accumulator.longest_run, accumulator.fastest_run)
+            if badges:
+                data["badges"] = badges
+
+
+def add_routes(args, client, cards):
+    """
+    Attach route thumbnails of the highlighted runs to card data (with --routes).
+
+    Tracks are fetched once per activity and kept in the route cache, so
+    re-rendering a card costs no API calls.
+
+    Args:
+        args: Parsed arguments
+        client: Client used for fetching (stravalib or AsyncFetchClient)
+        cards: Iterable of (accumulator, processed_data) pairs
+    """
+    if not args.routes:
+        return
+    from src.generate_image import StravaStatsImage
+    from src.route_cache import RouteCache, card_routes
+
+    route_cache = RouteCache(args.route_cache)
+    with profiling.stage("routes"):
+        for accumulator, data in cards:
+            routes = card_routes(route_cache, client, {
+                "longest_run": accumulator.longest_run,
+                "fastest_run": accumulator.fastest_run,
+            }, StravaStatsImage.ROUTE_SIZE)
+            if routes:
+                data["routes"] = routes
+
+
+EXPORT_FORMATS = ('json', 'csv')
+IMAGE_FORMATS = {'png': 'PNG', 'webp': 'WEBP', 'jpeg': 'JPEG'}
+# Week columns the heatmap grid fits at its fixed cell size; enough for any
+# calendar year (a leap year starting on a Sunday touches 54 weeks)
+HEATMAP_MAX_WEEKS = 54
+
+
+def encoder_options(args):
+    """Build the image encoder options from --preset and the encoder flags."""
+    from src.generate_image import EncoderOptions
+
+    return EncoderOptions.from_preset(
+        args.preset,
+        format=IMAGE_FORMATS.get(args.format),
+        quality=args.quality,
+        compress_level=args.compress_level,
+        colors=args.colors
+    )
+
+
+def image_outputs(args, output_path, image_class):
+    """
+    Output path per size chosen with --sizes: the default size keeps
+    output_path, other sizes get their name appended (stats_2024-03-11_square.png).
+    """
+    if not args.sizes:
+        return {image_class.DEFAULT_SIZE: str(output_path)}
+    names = [name.strip() for name in args.sizes.split(',') if name.strip()]
+    unknown = [name for name in names if name not in image_class.OUTPUT_SIZES]
+    if unknown or not names:
+        raise ValueError(f"Invalid sizes: {args.sizes}. Use comma-separated names of "
+                         f"{', '.join(image_class.OUTPUT_SIZES)}.")
+    path = Path(output_path)
+    return {
+        name: str(path if name == image_class.DEFAULT_SIZE else path.with_name(f"{path.stem}_{name}{path.suffix}"))
+        for name in names
+    }
+
+
+def render_cache(args):
+    """The render cache used to skip re-rendering unchanged images, if enabled."""
+    if args.no_render_cache:
+        return None
+    from src.render_cache import RenderCache
+    return RenderCache(args.render_cache, max_bytes=args.render_cache_size * 1024 * 1024)
+
+
+def export_output(args, default_name):
+    """Where headless (json/csv) output goes: a path, or stdout for "-"."""
+    if args.output == '-':
+        return args.stdout
+    if args.output:
+        return args.output
+    output_dir = Path("output")
+    output_dir.mkdir(parents=True, exist_ok=True)
+    return output_dir / f"{default_name}.{args.format}"
+
+
+def run_training_load(args, end_date):
+    """Write the rolling training load as of end_date as JSON."""
+    import json
+    from src.training_load import TrainingLoad, history_range
+
+    history_start, history_end = history_range(end_date)
+    print(f"Training load history: {history_start.date()} to {history_end.date()}")
+
+    client = connect(args)
+    activities = iter_activities(client, args, history_start, history_end)
+    with profiling.stage("process"):
+        load = TrainingLoad.from_runs(activities, history_start, history_end)
+        summary = load.summary(end_date)
+
+    if args.output == '-':
+        json.dump(summary, args.stdout, indent=2)
+        args.stdout.write("\n")
+        return
+    output = Path(args.output) if args.output else Path("output") / f"load_{end_date.strftime('%Y-%m-%d')}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(summary, f, indent=2)
+        f.write("\n")
+    print(f"✓ Training load: {output}")
+
+
+def athlete_cache(args, athlete_id):
+    """Activity store path of one athlete, next to --cache."""
+    cache = Path(args.cache)
+    return str(cache.with_name(f"{cache.stem}_{athlete_id}{cache.suffix}"))
+
+
+def select_athletes(args, token_store):
+    """The athletes chosen with --athletes ("all" or comma-separated ids)."""
+    athletes = token_store.athletes()
+    if args.athletes != 'all':
+        try:
+            wanted = {int(athlete_id) for athlete_id in args.athletes.split(',') if athlete_id.strip()}
+        except ValueError:
+            raise ValueError(f"Invalid athlete ids: {args.athletes}. Use \"all\" or comma-separated ids.")
+        missing = wanted - {athlete.athlete_id for athlete in athletes}
+        if missing:
+            raise ValueError(f"Athlete(s) not in the token store: {', '.join(map(str, sorted(missing)))}. "
+                             f"Add them with --add-athlete")
+        athletes = [athlete for athlete in athletes if athlete.athlete_id in wanted]
+    if not athletes:
+        raise ValueError("No athletes in the token store. Add them with --add-athlete")
+    return athletes
+
+
+def run_athletes(args, start_date, end_date, week_label):
+    """
+    Generate one card per athlete for a date range.
+
+    Athletes are fetched concurrently (at most --athlete-concurrency at a
+    time, each with its own token and activity store), then all cards are
+    rendered across the process pool.
+    """
+    from concurrent.futures import ThreadPoolExecutor
+    from src.generate_image import StravaStatsImage
+    from src.heatmap import YearHeatmapImage
+    from src.parallel_render import render_cards
+    from src.run_data_processor import process_run_stream
+    from src.token_store import TokenStore
+
+    token_store = TokenStore(args.token_store)
+    athletes = select_athletes(args, token_store)
+    print(f"Fetching {len(athletes)} athletes, {args.athlete_concurrency} at a time")
+
+    def fetch(athlete):
+        with profiling.stage("athlete", athlete_id=athlete.athlete_id):
+            cache = athlete_cache(args, athlete.athlete_id)
+            with profiling.stage("auth"):
+                client = fetch_client(args, token_store.client_for(athlete.athlete_id),
+                                      token_store.token_provider(athlete.athlete_id))
+            activities = iter_activities(client, args, start_date, end_date, cache)
+            if args.heatmap:
+                from src.heatmap import heatmap_data
+                with profiling.stage("process"):
+                    data = heatmap_data(activities, start_date, end_date)
+                return data if data["runs"] else None
+
+            with profiling.stage("process"):
+                accumulator = process_run_stream(activities)
+            if not accumulator.stats.total_runs:
+                return None
+            processed_data = accumulator.result()
+            add_record_badges(args, [(accumulator, processed_data)], cache)
+            add_routes(args, client, [(accumulator, processed_data)])
+            return processed_data
+
+    with ThreadPoolExecutor(max_workers=args.athlete_concurrency) as executor:
+        futures = [(athlete, executor.submit(fetch, athlete)) for athlete in athletes]
+
+    output_dir = Path(args.output or "output")
+    encoder = encoder_options(args)
+    jobs = []
+    failed = 0
+    for athlete, future in futures:
+        try:
+            processed_data = future.result()
+        except Exception as e:
+            print(f"  {athlete.name}: failed ({e})")
+            failed += 1
+            continue
+        if processed_data is None:
+            print(f"  {athlete.name}: no runs, skipped")
+            continue
+
+        athlete_dir = output_dir / str(athlete.athlete_id)
+        athlete_dir.mkdir(parents=True, exist_ok=True)
+        prefix = "heatmap" if args.heatmap else "stats"
+        output_path = athlete_dir / f"{prefix}_{start_date.strftime('%Y-%m-%d')}.{encoder.extension}"
+        image_class = YearHeatmapImage if args.heatmap else StravaStatsImage
+        jobs.append((processed_data, image_outputs(args, output_path, image_class), week_label))
+
+    if jobs and args.heatmap:
+        # Heatmaps render in milliseconds, so they stay in-process with shared fonts
+        fonts = YearHeatmapImage.load_fonts()
+        for data, outputs, label in jobs:
+            YearHeatmapImage.generate_sizes(data, label, outputs, encoder, fonts)
+    elif jobs:
+        with profiling.stage("render_cards", jobs=len(jobs)):
+            render_cards(jobs, args.workers, encoder, render_cache(args))
+    print(f"✓ Generated {sum(len(outputs) for _, outputs, _ in jobs)} images for {len(athletes)} athletes "
+          f"in {output_dir}")
+    if failed:
+        print(f"{failed} athlete(s) failed")
+        sys.exit(1)
+
+
+def run_heatmap(args, start_date, end_date, label):
+    """Render the calendar heatmap of daily distance for a date range."""
+    from src.heatmap import YearHeatmapImage, heatmap_data
+
+    client = connect(args)
+    activities = iter_activities(client, args, start_date, end_date)
+    with profiling.stage("process"):
+        data = heatmap_data(activities, start_date, end_date)
+    if not data["runs"]:
+        print("No runs found for the specified period.")
+        sys.exit(1)
+    print(f"Found {data['runs']} runs")
+
+    encoder = encoder_options(args)
+    if args.output:
+        output_path = args.output
+    else:
+        output_dir = Path("output")
+        output_dir.mkdir(parents=True, exist_ok=True)
+        output_path = output_dir / f"heatmap_{start_date.strftime('%Y-%m-%d')}.{encoder.extension}"
+
+    outputs = image_outputs(args, output_path, YearHeatmapImage)
+    YearHeatmapImage.generate_sizes(data, label, outputs, encoder)
+    for path in outputs.values():
+        print(f"✓ Generated: {path}")
+
+
+def run_import(args):
+    """Backfill the activity store (and with --routes the route cache) from a Strava bulk export."""
+    from src.activity_store import ActivityStore
+    from src.bulk_import import exported_at, iter_export
+
+    route_cache = None
+    if args.routes:
+        from src.route_cache import RouteCache
+        route_cache = RouteCache(args.route_cache)
+
+    print(f"Importing {args.import_export}")
+    with profiling.stage("import"), ActivityStore(args.cache) as store:
+        count = store.import_activities(
+            iter_export(args.import_export, args.workers, route_cache), exported_at(args.import_export)
+        )
+    print(f"✓ Imported {count} activities into {args.cache}")
+
+
+def run_batch(args):
+    """Generate one image (or export row) per week between --weeks-from and --weeks-to."""
+    week_ranges = list(iter_week_ranges(
+        parse_date_input(args.weeks_from),
+        parse_date_input(args.weeks_to)
+    ))
+    if not week_ranges:
+        raise ValueError("--weeks-from must not be after --weeks-to")
+
+    span_start, span_end = week_ranges[0][0], week_ranges[-1][1]
+    print(f"Generating {len(week_ranges)} weekly images")
+    print(f"Date range: {span_start.date()} to {span_end.date()}")
+
+    # Authenticate and fetch the whole span once
+    client = connect(args)
+    activities = iter_activities(client, args, span_start, span_end)
+    with profiling.stage("process"):
+        weeks = accumulate_by_week(activities)
+    print(f"Found {sum(week.stats.total_runs for week in weeks.values())} runs")
+
+    if args.format in EXPORT_FORMATS:
+        from src.export import export_stats, stats_to_dict
+        periods = [
+            stats_to_dict(
+                weeks[start_date], start_date, end_date,
+                f"{start_date.strftime('%b %d')} - {end_date.strftime('%b %d, %Y')}"
+            )
+            for start_date, end_date in week_ranges if start_date in weeks
+        ]
+        if not periods:
+            print("No runs found for the specified period.")
+            sys.exit(1)
+        output = export_output(
+            args, f"stats_{span_start.strftime('%Y-%m-%d')}_{span_end.strftime('%Y-%m-%d')}"
+        )
+        with profiling.stage("export"):
+            export_stats(periods, args.format, output)
+        print(f"✓ Exported {len(periods)} weeks to {'stdout' if output is args.stdout else output}")
+        return
+
+    from src.generate_image import StravaStatsImage
+
+    output_dir = Path(args.output or "output")
+    output_dir.mkdir(parents=True, exist_ok=True)
+    encoder = encoder_options(args)
+
+    jobs = []
+    cards = []
+    for start_date, end_date in week_ranges:
+        week = weeks.get(start_date)
+        date_label = f"{start_date.strftime('%b %d')} - {end_date.strftime('%b %d, %Y')}"
+        if week is None:
+            print(f"  {date_label}: no runs, skipped")
+            continue
+
+        processed_data = week.result()
+        cards.append((week, processed_data))
+        output_path = output_dir / f"stats_{start_date.strftime('%Y-%m-%d')}.{encoder.extension}"
+        jobs.append((processed_data, image_outputs(args, output_path, StravaStatsImage), date_label))
+
+    if not jobs:
+        print("No runs found for the specified period.")
+        sys.exit(1)
+    add_record_badges(args, cards)
+    add_routes(args, client, cards)
+
+    # Render all weeks across a process pool
+    from src.parallel_render import render_cards
+    with profiling.stage("render_cards", jobs=len(jobs)):
+        render_cards(jobs, args.workers, encoder, render_cache(args))
+
+    print(f"✓ Generated {sum(len(outputs) for _, outputs, _ in jobs)} images in {output_dir}")
+
+
+def report_profile(trace_path):
+    """Print the stage summary (to stderr with --output -) and write the Chrome trace if asked."""
+    print("\nProfile:")
+    print(profiling.summary_table())
+    if trace_path is not True:
+        profiling.write_chrome_trace(trace_path)
+        print(f"✓ Chrome trace: {trace_path}")
+    profiling.disable()
 
 
 def main():
@@ -25,6 +467,13 @@ Examples:
   %(prog)s --week-of 2024-03-15     # Same as --date
   %(prog)s --start 2024-03-11 --end 2024-03-17  # Custom date range
   %(prog)s --last-week --label "Training Week 5"  # Custom label
+  %(prog)s --weeks-from 2024-01-01 --weeks-to 2024-12-31  # One image per week
+  %(prog)s --date 2024-03-15 --format json -o -  # Stats as JSON on stdout
+  %(prog)s --year 2024 --heatmap     # Year-in-review calendar heatmap
+  %(prog)s --date 2024-03-15 --training-load -o -  # Rolling 7/28/365-day load as JSON
+  %(prog)s --add-athlete             # Authorize another athlete for --athletes
+  %(prog)s --last-week --athletes all  # One card per stored athlete
+  %(prog)s --serve --port 8000      # Serve GET /card?week=2024-03-11 from a warm process
         """
     )
 
@@ -43,22 +492,202 @@ Examples:
         '--start',
         help='Custom start date (YYYY-MM-DD). Must be used with --end'
     )
+    date_group.add_argument(
+        '--year',
+        type=int,
+        help='Whole calendar year (YYYY), e.g. with --heatmap'
+    )
+    date_group.add_argument(
+        '--weeks-from',
+        help='Batch mode: first week to generate (YYYY-MM-DD). Must be used with --weeks-to'
+    )
 
     parser.add_argument(
         '--end',
         help='Custom end date (YYYY-MM-DD). Must be used with --start'
     )
+    parser.add_argument(
+        '--weeks-to',
+        help='Batch mode: last week to generate (YYYY-MM-DD). Must be used with --weeks-from'
+    )
 
     # Output options
     parser.add_argument(
         '--output', '-o',
-        help='Output file path (default: output/images/stats_YYYY-MM-DD.png)'
+        help='Output file path, or output directory for batch images; '
+             '"-" writes json/csv to stdout (default: output/stats_YYYY-MM-DD.png)'
+    )
+    parser.add_argument(
+        '--sizes',
+        help='Comma-separated output sizes: story (1080x1920, default), square (1080x1080), '
+             'thumbnail (270x480); heatmaps: square, thumbnail (270x270)'
+    )
+    parser.add_argument(
+        '--format', '-f',
+        choices=list(IMAGE_FORMATS) + list(EXPORT_FORMATS),
+        help='Output format: png/webp/jpeg image, or json/csv stats without rendering '
+             '(default: png, or the format of --preset)'
+    )
+
+    # Image encoder options
+    parser.add_argument(
+        '--preset',
+        default='default',
+        choices=['default', 'fast', 'small', 'web'],
+        help='Image encoder preset: fast (quick PNG), small (palette PNG), web (WebP) (default: default)'
+    )
+    parser.add_argument(
+        '--quality',
+        type=int,
+        help='WebP/JPEG quality, 1-100'
+    )
+    parser.add_argument(
+        '--compress-level',
+        type=int,
+        choices=range(10),
+        metavar='0-9',
+        help='PNG compression level (lower is faster, higher is smaller)'
+    )
+    parser.add_argument(
+        '--colors',
+        type=int,
+        help='Quantise the image to a palette with this many colours, 2-256'
     )
     parser.add_argument(
         '--label', '-l',
         help='Custom label for the image (default: week dates)'
     )
 
+    parser.add_argument(
+        '--heatmap',
+        action='store_true',
+        help='Render a calendar heatmap of daily distance with monthly totals '
+             '(use with --year or --start/--end)'
+    )
+    parser.add_argument(
+        '--training-load',
+        action='store_true',
+        help='Write rolling 7/28/365-day totals, the acute:chronic ratio and the '
+             'week-over-week change as of the end of the selected period (JSON)'
+    )
+
+    parser.add_argument(
+        '--workers',
+        type=int,
+        help='Batch mode: number of render processes; --import-export: number of parse processes '
+             '(default: number of CPU cores)'
+    )
+    parser.add_argument(
+        '--import-export',
+        metavar='EXPORT.zip',
+        help='Backfill the local store from a Strava bulk export zip instead of the API'
+    )
+
+    # Fetch options
+    parser.add_argument(
+        '--async-fetch',
+        action='store_true',
+        help='Fetch activity pages concurrently with rate-limit pacing (requires aiohttp)'
+    )
+    parser.add_argument(
+        '--fetch-concurrency',
+        type=int,
+        default=4,
+        help='Number of activity pages requested at once with --async-fetch (default: 4)'
+    )
+
+    # Activity cache options
+    parser.add_argument(
+        '--cache',
+        default=str(Path("output") / "activities.db"),
+        help='Local activity store path (default: output/activities.db)'
+    )
+    parser.add_argument(
+        '--no-cache',
+        action='store_true',
+        help='Fetch the whole range from Strava without using the local store'
+    )
+
+    # Render cache options
+    parser.add_argument(
+        '--render-cache',
+        default=str(Path("output") / "render_cache"),
+        help='Directory of previously rendered images reused when nothing changed '
+             '(default: output/render_cache)'
+    )
+    parser.add_argument(
+        '--render-cache-size',
+        type=int,
+        default=256,
+        help='Maximum render cache size in MB before old entries are evicted (default: 256)'
+    )
+    parser.add_argument(
+        '--no-render-cache',
+        action='store_true',
+        help='Always render images, without reading or writing the render cache'
+    )
+
+    # Route options
+    parser.add_argument(
+        '--routes',
+        action='store_true',
+        help='Draw route thumbnails of the fastest and longest runs (one API call per new run)'
+    )
+    parser.add_argument(
+        '--route-cache',
+        default=str(Path("output") / "routes"),
+        help='Directory of fetched, simplified GPS tracks (default: output/routes)'
+    )
+
+    # Multi-athlete options
+    parser.add_argument(
+        '--athletes',
+        help='Generate one card per athlete from the token store: "all" or comma-separated athlete ids'
+    )
+    parser.add_argument(
+        '--add-athlete',
+        action='store_true',
+        help='Authorize an athlete and add them to the token store'
+    )
+    parser.add_argument(
+        '--token-store',
+        default=str(Path("output") / "tokens.db"),
+        help='Per-athlete token store used by --athletes (default: output/tokens.db)'
+    )
+    parser.add_argument(
+        '--athlete-concurrency',
+        type=int,
+        default=4,
+        help='Number of athletes fetched at once with --athletes (default: 4)'
+    )
+
+    # Service options
+    parser.add_argument(
+        '--serve',
+        action='store_true',
+        help='Run a local HTTP service answering GET /card?week=YYYY-MM-DD with warm state'
+    )
+    parser.add_argument(
+        '--host',
+        default='127.0.0.1',
+        help='Address the service listens on (default: 127.0.0.1)'
+    )
+    parser.add_argument(
+        '--port',
+        type=int,
+        default=8000,
+        help='Port the service listens on (default: 8000)'
+    )
+
+    parser.add_argument(
+        '--profile',
+        nargs='?',
+        const=True,
+        metavar='TRACE.json',
+        help='Print per-stage timings, API calls and peak memory; with a path, '
+             'also write a Chrome trace (chrome://tracing, Perfetto)'
+    )
+
     # Parse arguments
     args = parser.parse_args()
 
@@ -67,13 +696,94 @@ Examples:
         parser.error("--start requires --end")
     if args.end and not args.start:
         parser.error("--end requires --start")
+    if args.weeks_from and not args.weeks_to:
+        parser.error("--weeks-from requires --weeks-to")
+    if args.weeks_to and not args.weeks_from:
+        parser.error("--weeks-to requires --weeks-from")
+    if args.weeks_from and args.label:
+        parser.error("--label cannot be used with --weeks-from")
+    if args.athletes and (args.weeks_from or args.serve or args.training_load
+                          or args.format in EXPORT_FORMATS):
+        parser.error("--athletes renders one image per athlete for a single date range")
+    if args.athlete_concurrency < 1:
+        parser.error("--athlete-concurrency must be at least 1")
+    if args.fetch_concurrency < 1:
+        parser.error("--fetch-concurrency must be at least 1")
+    if args.quality is not None and not 1 <= args.quality <= 100:
+        parser.error("--quality must be between 1 and 100")
+    if args.colors is not None and not 2 <= args.colors <= 256:
+        parser.error("--colors must be between 2 and 256")
+    if args.heatmap and not (args.year or args.start):
+        parser.error("--heatmap requires --year or --start/--end")
+    if args.heatmap and args.start and args.end:
+        try:
+            weeks = sum(1 for _ in iter_week_ranges(parse_date_input(args.start), parse_date_input(args.end)))
+        except ValueError:
+            weeks = 0  # Reported with the other date errors below
+        if weeks > HEATMAP_MAX_WEEKS:
+            parser.error(f"--heatmap spans at most {HEATMAP_MAX_WEEKS} weeks (about a year); "
+                         f"--start/--end cover {weeks}")
+    if args.heatmap and (args.serve or args.training_load or args.format in EXPORT_FORMATS):
+        parser.error("--heatmap renders an image and cannot be combined with --serve, "
+                     "--training-load or json/csv output")
+    if args.training_load and (args.weeks_from or args.serve):
+        parser.error("--training-load cannot be used with --weeks-from or --serve")
+    if args.output == '-' and args.format not in EXPORT_FORMATS and not args.training_load:
+        parser.error("--output - requires --format json or csv")
+    if args.serve and (args.start or args.date or args.year or args.weeks_from or args.output):
+        parser.error("--serve takes the week from each request, not from the command line")
+    if args.sizes and (args.serve or args.training_load or args.format in EXPORT_FORMATS):
+        parser.error("--sizes applies to rendered images; the service takes ?size= per request")
+    if args.import_export and (args.serve or args.athletes or args.weeks_from or args.no_cache):
+        parser.error("--import-export fills the local store and cannot be combined with --serve, "
+                     "--athletes, --weeks-from or --no-cache")
+    if args.serve and (args.format in EXPORT_FORMATS or args.no_cache):
+        parser.error("--serve renders images from the local store; use GET /stats for JSON")
+
+    # Keep stdout clean for exported data; progress messages go to stderr
+    args.stdout = sys.stdout
+    if args.output == '-':
+        sys.stdout = sys.stderr
+
+    if args.profile:
+        profiling.enable()
 
     try:
+        if args.add_athlete:
+            from src.token_store import TokenStore, authorize_athlete
+            athlete = authorize_athlete(TokenStore(args.token_store))
+            print(f"✓ Added athlete {athlete.name} ({athlete.athlete_id}) to {args.token_store}")
+            return
+
+        if args.import_export:
+            run_import(args)
+            return
+
+        if args.serve:
+            from src.service import CardService, serve
+            route_cache = None
+            if args.routes:
+                from src.route_cache import RouteCache
+                route_cache = RouteCache(args.route_cache)
+            service = CardService(connect(args), args.cache, encoder_options(args), route_cache=route_cache)
+            serve(service, args.host, args.port)
+            return
+
+        if args.weeks_from:
+            run_batch(args)
+            return
+
         # Determine date range
         if args.start and args.end:
             start_date = parse_date_input(args.start)
             end_date = parse_date_input(args.end)
             date_label = f"{start_date.strftime('%b %d')} - {end_date.strftime('%b %d, %Y')}"
+        elif args.year:
+            start_date = parse_date_input(f"{args.year:04d}-01-01")
+            end_date = parse_date_input(f"{args.year:04d}-12-31").replace(
+                hour=23, minute=59, second=59, microsecond=999999
+            )
+            date_label = str(args.year)
         elif args.date:
             start_date, end_date = get_week_range(parse_date_input(args.date))
             date_label = f"{start_date.strftime('%b %d')} - {end_date.strftime('%b %d, %Y')}"
@@ -82,26 +792,57 @@ Examples:
             start_date, end_date = get_week_range()
             date_label = f"{start_date.strftime('%b %d')} - {end_date.strftime('%b %d, %Y')}"
 
+        if args.training_load:
+            run_training_load(args, end_date)
+            return
+
         # Use custom label if provided
         week_label = args.label or date_label
+        if args.heatmap and args.year and not args.label:
+            week_label = f"{args.year} IN RUNNING"
 
         print(f"Generating stats for: {date_label}")
         print(f"Date range: {start_date.date()} to {end_date.date()}")
 
+        if args.athletes:
+            run_athletes(args, start_date, end_date, week_label)
+            return
+
+        if args.heatmap:
+            run_heatmap(args, start_date, end_date, week_label)
+            return
+
         # Authenticate and fetch data
-        client = authenticate_strava()
-        activities = client.get_activities(after=start_date, before=end_date)
-        runs = [activity for activity in activities if activity.type == 'Run']
+        client = connect(args)
+        activities = iter_activities(client, args, start_date, end_date)
 
-        if not runs:
+        # Process the data as it streams in
+        from src.run_data_processor import process_run_stream
+        with profiling.stage("process"):
+            accumulator = process_run_stream(activities)
+
+        if not accumulator.stats.total_runs:
             print(f"No runs found for the specified period.")
             sys.exit(1)
 
-        print(f"Found {len(runs)} runs")
+        print(f"Found {accumulator.stats.total_runs} runs")
+
+        # Headless export skips rendering (and Pillow) entirely
+        if args.format in EXPORT_FORMATS:
+            from src.export import export_stats, stats_to_dict
+            output = export_output(args, f"stats_{start_date.strftime('%Y-%m-%d')}")
+            with profiling.stage("export"):
+                export_stats(
+                    [stats_to_dict(accumulator, start_date, end_date, week_label)],
+                    args.format, output, single=True
+                )
+            print(f"✓ Exported: {'stdout' if output is args.stdout else output}")
+            return
 
-        # Process the data
-        processor = RunDataProcessor(runs)
-        processed_data = processor.process_runs()
+        processed_data = accumulator.result()
+        add_record_badges(args, [(accumulator, processed_data)])
+        add_routes(args, client, [(accumulator, processed_data)])
+        encoder = encoder_options(args)
 
         # Generate output filename
         if args.output:
@@ -110,17 +851,22 @@ Examples:
             # Create output directory if it doesn't exist
             output_dir = Path("output")
             output_dir.mkdir(parents=True, exist_ok=True)
-            filename = f"stats_{start_date.strftime('%Y-%m-%d')}.png"
+            filename = f"stats_{start_date.strftime('%Y-%m-%d')}.{encoder.extension}"
             output_path = output_dir / filename
 
-        # Generate the image
-        generate_strava_stats_image(
+        # Generate the image in every requested size
+        from src.generate_image import StravaStatsImage, generate_strava_stats_images
+        outputs = image_outputs(args, output_path, StravaStatsImage)
+        generate_strava_stats_images(
             processed_data,
-            str(output_path),
-            week_label
+            outputs,
+            week_label,
+            encoder,
+            render_cache(args)
         )
 
-        print(f"✓ Generated: {output_path}")
+        for path in outputs.values():
+            print(f"✓ Generated: {path}")
 
     except ValueError as e:
         print(f"Error: {e}")
@@ -131,6 +877,9 @@ Examples:
     except Exception as e:
         print(f"Error: {e}")
         sys.exit(1)
+    finally:
+        if args.profile:
+            report_profile(args.profile)
 
 
 if __name__ == "__main__":
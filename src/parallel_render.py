@@ -0,0 +1,86 @@
+"""
+Parallel rendering for RunDown - spreads many stats images across a process pool.
+"""
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+
+from src.generate_image import (
+    EncoderOptions, StravaStatsImage, fetch_cached_images, generate_strava_stats_images
+)
+from src.render_cache import RenderCache
+
+# (processed_data, output_path or {size name: output_path}, week_label)
+RenderJob = Tuple[Dict, Union[str, Dict[str, str]], str]
+
+# Fonts loaded once per worker process by _init_worker, with the shared encoder
+# options and render cache
+_worker_fonts = None
+_worker_encoder = None
+_worker_cache = None
+
+
+def _init_worker(encoder=None, cache=None):
+    global _worker_fonts, _worker_encoder, _worker_cache
+    _worker_fonts = StravaStatsImage.load_fonts()
+    _worker_encoder = encoder
+    _worker_cache = cache
+
+
+def _outputs(output) -> Dict[str, str]:
+    """A job's outputs as {size name: path}; a single path is the default size."""
+    return output if isinstance(output, dict) else {StravaStatsImage.DEFAULT_SIZE: output}
+
+
+def _render_job(job: RenderJob):
+    data, outputs, week_label = job
+    generate_strava_stats_images(data, outputs, week_label, encoder=_worker_encoder,
+                                 cache=_worker_cache, fonts=_worker_fonts)
+    return outputs
+
+
+def render_cards(jobs: Sequence[RenderJob], workers: Optional[int] = None,
+                 encoder: Optional[EncoderOptions] = None,
+                 cache: Optional[RenderCache] = None) -> List[Union[str, Dict[str, str]]]:
+    """
+    Render stats images in parallel.
+
+    Only the small processed data dicts are sent to the workers; each worker
+    loads the fonts once and reuses them for every job it renders. A job
+    with several sizes is laid out once per drawn size (see
+    StravaStatsImage.render_sizes).
+
+    Args:
+        jobs: Sequence of (processed_data, output_path, week_label) tuples;
+            output_path may be a {size name: path} mapping
+        workers: Number of worker processes (default: number of CPU cores)
+        encoder: Encoder options used for every image
+        cache: Render cache; unchanged images are copied instead of re-rendered
+
+    Returns:
+        List of the jobs' output paths (or mappings) in the same order as jobs
+    """
+    output_paths = [job[1] for job in jobs]
+    jobs = [(data, _outputs(output), week_label) for data, output, week_label in jobs]
+
+    # Resolve cache hits up front so unchanged images never reach the pool
+    if cache is not None:
+        jobs = [(data, fetch_cached_images(data, outputs, week_label, encoder, cache), week_label)
+                for data, outputs, week_label in jobs]
+        jobs = [job for job in jobs if job[1]]
+    if not jobs:
+        return output_paths
+
+    workers = min(workers or os.cpu_count() or 1, len(jobs))
+    if workers <= 1:
+        _init_worker(encoder, cache)
+        for job in jobs:
+            _render_job(job)
+        return output_paths
+
+    chunksize = max(1, len(jobs) // (workers * 4))
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(encoder, cache)) as executor:
+        list(executor.map(_render_job, jobs, chunksize=chunksize))
+    return output_paths
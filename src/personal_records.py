@@ -0,0 +1,242 @@
+"""
+Personal records for RunDown - an incrementally maintained index of the
+top-k longest and fastest runs, overall and per distance bracket, kept in
+the activity store so cards can show PR badges without rescanning history.
+"""
+
+import sqlite3
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# Distance brackets as (name, minimum distance in metres); a run belongs to
+# the longest bracket it reaches
+BRACKETS = (
+    ("5K", 5000.0),
+    ("10K", 10000.0),
+    ("HALF", 21097.5),
+    ("MARATHON", 42195.0),
+)
+# GPS distances often come up slightly short of the nominal race distance
+BRACKET_TOLERANCE = 0.99
+OVERALL = "overall"
+KINDS = ("longest", "fastest")
+TOP_K = 3
+# Shorter runs are left out of the overall fastest board so strides and GPS
+# glitches do not hold the all-time pace record
+MIN_FASTEST_DISTANCE = 1000.0
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS personal_records (
+    category TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    rank INTEGER NOT NULL,
+    activity_id INTEGER NOT NULL,
+    value REAL NOT NULL,
+    PRIMARY KEY (category, kind, rank)
+);
+"""
+
+# (value, activity_id); longest boards sort by -distance so both kinds sort ascending
+Entry = Tuple[float, int]
+
+
+def bracket_of(distance: float) -> Optional[str]:
+    """Name of the distance bracket a run belongs to, or None below the shortest."""
+    name = None
+    for bracket, minimum in BRACKETS:
+        if distance >= minimum * BRACKET_TOLERANCE:
+            name = bracket
+    return name
+
+
+def _pace(distance: float, moving_time: int) -> Optional[float]:
+    if distance <= 0 or moving_time <= 0:
+        return None
+    return moving_time / (distance / 1000)
+
+
+class PersonalRecords:
+    """
+    Top-k boards keyed by (category, kind), where category is "overall" or a
+    bracket name and kind is "longest" or "fastest".
+
+    Boards are loaded once, updated in memory as runs are offered and only
+    the boards that changed are written back by save(). A board that lost a
+    holder to a re-offer is reloaded from the activities table on save(), so
+    the run it had evicted earlier can come back.
+    """
+
+    def __init__(self, conn: sqlite3.Connection, top_k: int = TOP_K):
+        self.conn = conn
+        self.top_k = top_k
+        self.conn.executescript(SCHEMA)
+        self._boards: Dict[Tuple[str, str], List[Entry]] = {}
+        self._dirty = set()
+        self._stale = set()
+        rows = self.conn.execute(
+            "SELECT category, kind, activity_id, value FROM personal_records ORDER BY rank"
+        )
+        for category, kind, activity_id, value in rows:
+            self._boards.setdefault((category, kind), []).append((value, activity_id))
+
+    def _boards_for(self, distance: float, moving_time: int) -> List[Tuple[Tuple[str, str], float]]:
+        """The (board key, sort value) pairs a run competes on."""
+        categories = [OVERALL]
+        bracket = bracket_of(distance)
+        if bracket:
+            categories.append(bracket)
+
+        boards = [((category, "longest"), -distance) for category in categories]
+        pace = _pace(distance, moving_time)
+        if pace is not None:
+            boards.extend(
+                ((category, "fastest"), pace) for category in categories
+                if category != OVERALL or distance >= MIN_FASTEST_DISTANCE
+            )
+        return boards
+
+    def offer(self, activity_id: int, distance: float, moving_time: int) -> List[Tuple[str, str, int]]:
+        """
+        Fold one run into the boards.
+
+        Re-offering an activity (e.g. after it was edited) replaces its entries;
+        the boards it was on are reloaded from the activities table by save().
+
+        Returns:
+            (category, kind, rank) for every board the run placed on, rank 1 being the record
+        """
+        activity_id = int(activity_id)
+        placed = []
+        self.discard(activity_id)
+        for key, value in self._boards_for(float(distance), int(moving_time)):
+            board = self._boards.setdefault(key, [])
+            if len(board) >= self.top_k and value >= board[-1][0]:
+                continue
+            # Ties keep the earlier holder ahead
+            rank = sum(1 for entry in board if entry[0] <= value)
+            board.insert(rank, (value, activity_id))
+            del board[self.top_k:]
+            self._dirty.add(key)
+            placed.append((key[0], key[1], rank + 1))
+        return placed
+
+    def discard(self, activity_id: int):
+        """
+        Take an activity off every board, e.g. when it is no longer a run; the
+        boards it was on are reloaded from the activities table by save().
+        """
+        activity_id = int(activity_id)
+        for key, board in self._boards.items():
+            if any(entry[1] == activity_id for entry in board):
+                board[:] = [entry for entry in board if entry[1] != activity_id]
+                self._dirty.add(key)
+                self._stale.add(key)
+
+    def update(self, runs: Iterable) -> List[Tuple[int, str, str, int]]:
+        """
+        Offer every run of an iterable.
+
+        Returns:
+            (activity_id, category, kind, rank) for every placement
+        """
+        placements = []
+        for run in runs:
+            for category, kind, rank in self.offer(run.id, run.distance, run.moving_time):
+                placements.append((run.id, category, kind, rank))
+        return placements
+
+    def _reload(self, keys):
+        """Recompute some boards from the stored runs."""
+        boards = {key: [] for key in keys}
+        rows = self.conn.execute(
+            "SELECT id, distance, moving_time FROM activities WHERE type = 'Run'"
+        )
+        for activity_id, distance, moving_time in rows:
+            for key, value in self._boards_for(float(distance), int(moving_time)):
+                if key in boards:
+                    boards[key].append((value, activity_id))
+        for key, board in boards.items():
+            # Stable sort, so ties keep the earlier stored run ahead
+            board.sort(key=lambda entry: entry[0])
+            self._boards[key] = board[:self.top_k]
+
+    def save(self):
+        """
+        Write the boards that changed since loading (the caller commits).
+
+        Call it once the offered runs are in the activities table, which the
+        boards that lost a holder are reloaded from.
+        """
+        if self._stale:
+            self._reload(self._stale)
+            self._stale.clear()
+        for category, kind in self._dirty:
+            self.conn.execute(
+                "DELETE FROM personal_records WHERE category = ? AND kind = ?", (category, kind)
+            )
+            self.conn.executemany(
+                "INSERT INTO personal_records (category, kind, rank, activity_id, value) "
+                "VALUES (?, ?, ?, ?, ?)",
+                [
+                    (category, kind, rank, activity_id, value)
+                    for rank, (value, activity_id) in enumerate(self._boards[(category, kind)], start=1)
+                ]
+            )
+        self._dirty.clear()
+
+    def rebuild(self):
+        """Recompute every board from the stored runs."""
+        self.conn.execute("DELETE FROM personal_records")
+        self._boards.clear()
+        self._dirty.clear()
+        self._stale.clear()
+        rows = self.conn.execute(
+            "SELECT id, distance, moving_time FROM activities WHERE type = 'Run'"
+        )
+        for activity_id, distance, moving_time in rows:
+            self.offer(activity_id, distance, moving_time)
+        self.save()
+
+    def records(self, category: str = OVERALL, kind: str = "longest") -> List[Tuple[int, float]]:
+        """
+        The board for a category and kind, best first.
+
+        Returns:
+            List of (activity_id, value) with value in metres for longest and
+            seconds per km for fastest
+        """
+        if kind not in KINDS:
+            raise ValueError(f"Unknown record kind: {kind}. Use one of: {', '.join(KINDS)}")
+        board = self._boards.get((category, kind), [])
+        return [(activity_id, -value if kind == "longest" else value) for value, activity_id in board]
+
+    def rank(self, activity_id: int, category: str, kind: str) -> Optional[int]:
+        """1-based rank of an activity on a board, or None if it is not on it."""
+        for rank, (_, holder) in enumerate(self._boards.get((category, kind), []), start=1):
+            if holder == activity_id:
+                return rank
+        return None
+
+    def badge(self, run, kind: str) -> Optional[str]:
+        """
+        Badge text when a run holds a record: the overall record for longest,
+        and the bracket record (else the overall one) for fastest.
+        """
+        if run is None:
+            return None
+        if kind == "longest":
+            return "NEW PR" if self.rank(run.id, OVERALL, kind) == 1 else None
+
+        bracket = bracket_of(float(run.distance))
+        if bracket and self.rank(run.id, bracket, kind) == 1:
+            return f"NEW {bracket} PR"
+        if self.rank(run.id, OVERALL, kind) == 1:
+            return "NEW PR"
+        return None
+
+    def badges(self, longest_run=None, fastest_run=None) -> Dict[str, str]:
+        """Badges for a card's highlighted runs, keyed like the processed data."""
+        badges = {
+            "longest_run": self.badge(longest_run, "longest"),
+            "fastest_run": self.badge(fastest_run, "fastest"),
+        }
+        return {key: badge for key, badge in badges.items() if badge}
@@ -0,0 +1,219 @@
+"""
+Stage profiling for RunDown - records wall time, Strava API calls and peak
+Python memory per stage, printable as a summary table and exportable as a
+Chrome trace (chrome://tracing, Perfetto).
+
+Profiling is off unless enable() is called; stage() then costs one global
+lookup, so the instrumentation stays in place in normal runs.
+"""
+
+import contextlib
+import json
+import os
+import threading
+import time
+import tracemalloc
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+_enabled = False
+_trace_memory = False
+_records: List["StageRecord"] = []
+_records_lock = threading.Lock()
+_api_calls = 0
+_api_calls_lock = threading.Lock()
+_local = threading.local()
+_origin_ns = 0
+_NULL_STAGE = contextlib.nullcontext()
+
+
+@dataclass
+class StageRecord:
+    name: str
+    start_ns: int
+    end_ns: int = 0
+    depth: int = 0
+    thread_id: int = 0
+    api_calls: int = 0
+    peak_bytes: Optional[int] = None
+    args: Dict = field(default_factory=dict)
+
+    @property
+    def duration_ms(self) -> float:
+        return (self.end_ns - self.start_ns) / 1e6
+
+
+def enable(memory: bool = True):
+    """
+    Start recording stages.
+
+    Args:
+        memory: Also track peak Python memory per stage with tracemalloc
+            (slows allocation-heavy stages down noticeably)
+    """
+    global _enabled, _trace_memory, _origin_ns
+    reset()
+    _enabled = True
+    _trace_memory = memory
+    _origin_ns = time.perf_counter_ns()
+    if memory and not tracemalloc.is_tracing():
+        tracemalloc.start()
+
+
+def disable():
+    global _enabled
+    _enabled = False
+    if _trace_memory and tracemalloc.is_tracing():
+        tracemalloc.stop()
+
+
+def enabled() -> bool:
+    return _enabled
+
+
+def reset():
+    """Drop the recorded stages and the API call count."""
+    global _api_calls
+    with _records_lock:
+        _records.clear()
+    with _api_calls_lock:
+        _api_calls = 0
+
+
+def count_api_call(count: int = 1):
+    """Count Strava API requests; attributed to every stage open meanwhile."""
+    global _api_calls
+    if _enabled:
+        with _api_calls_lock:
+            _api_calls += count
+
+
+def instrument_client(client):
+    """
+    Count the requests of a stravalib client and time each as a "fetch" stage
+    (clients without a protocol are left alone).
+    """
+    protocol = getattr(client, "protocol", None)
+    if not _enabled or protocol is None:
+        return client
+    request = protocol._request
+
+    def _request(*args, **kwargs):
+        with stage("fetch"):
+            count_api_call()
+            return request(*args, **kwargs)
+
+    protocol._request = _request
+    return client
+
+
+def _stack() -> List[StageRecord]:
+    stack = getattr(_local, "stack", None)
+    if stack is None:
+        stack = _local.stack = []
+    return stack
+
+
+class _Stage:
+    __slots__ = ("record", "api_calls_start")
+
+    def __init__(self, name: str, args: Dict):
+        self.record = StageRecord(name, 0, args=args)
+
+    def __enter__(self):
+        stack = _stack()
+        record = self.record
+        record.depth = len(stack)
+        record.thread_id = threading.get_ident()
+        if _trace_memory:
+            # Fold the peak so far into the enclosing stage before resetting it
+            peak = tracemalloc.get_traced_memory()[1]
+            if stack:
+                stack[-1].peak_bytes = max(stack[-1].peak_bytes or 0, peak)
+            tracemalloc.reset_peak()
+            record.peak_bytes = 0
+        stack.append(record)
+        self.api_calls_start = _api_calls
+        record.start_ns = time.perf_counter_ns()
+        return record
+
+    def __exit__(self, exc_type, exc, tb):
+        record = self.record
+        record.end_ns = time.perf_counter_ns()
+        record.api_calls = _api_calls - self.api_calls_start
+        stack = _stack()
+        stack.pop()
+        if _trace_memory:
+            record.peak_bytes = max(record.peak_bytes, tracemalloc.get_traced_memory()[1])
+            if stack:
+                stack[-1].peak_bytes = max(stack[-1].peak_bytes or 0, record.peak_bytes)
+            tracemalloc.reset_peak()
+        with _records_lock:
+            _records.append(record)
+        return False
+
+
+def stage(name: str, **args):
+    """Context manager timing a stage; a shared no-op when profiling is off."""
+    if not _enabled:
+        return _NULL_STAGE
+    return _Stage(name, args)
+
+
+def records() -> List[StageRecord]:
+    """Finished stages in start order."""
+    with _records_lock:
+        return sorted(_records, key=lambda record: record.start_ns)
+
+
+def summary_table() -> str:
+    """Stages aggregated by name (in first-start order), indented by nesting depth, and the total wall time."""
+    rows: Dict[str, Dict] = {}
+    for record in records():
+        row = rows.setdefault(record.name, {
+            "depth": record.depth, "calls": 0, "total_ms": 0.0, "api_calls": 0, "peak_bytes": None,
+        })
+        row["calls"] += 1
+        row["total_ms"] += record.duration_ms
+        row["api_calls"] += record.api_calls
+        if record.peak_bytes is not None:
+            row["peak_bytes"] = max(row["peak_bytes"] or 0, record.peak_bytes)
+
+    name_width = max([len("Stage")] + [2 * row["depth"] + len(name) for name, row in rows.items()])
+    lines = [f"{'Stage':<{name_width}}  {'Calls':>5}  {'Total ms':>10}  {'API calls':>9}  {'Peak KB':>9}"]
+    for name, row in rows.items():
+        peak = f"{row['peak_bytes'] / 1024:.0f}" if row["peak_bytes"] is not None else "-"
+        lines.append(
+            f"{'  ' * row['depth'] + name:<{name_width}}  {row['calls']:>5}  {row['total_ms']:>10.2f}  "
+            f"{row['api_calls']:>9}  {peak:>9}"
+        )
+    lines.append(f"Total {(time.perf_counter_ns() - _origin_ns) / 1e6:.2f} ms, {_api_calls} API calls")
+    return "\n".join(lines)
+
+
+def chrome_trace() -> Dict:
+    """Recorded stages as Chrome trace complete ("X") events."""
+    pid = os.getpid()
+    events = []
+    for record in records():
+        args = dict(record.args, api_calls=record.api_calls)
+        if record.peak_bytes is not None:
+            args["peak_kb"] = round(record.peak_bytes / 1024, 1)
+        events.append({
+            "name": record.name,
+            "cat": "rundown",
+            "ph": "X",
+            "ts": (record.start_ns - _origin_ns) / 1000,
+            "dur": (record.end_ns - record.start_ns) / 1000,
+            "pid": pid,
+            "tid": record.thread_id,
+            "args": {key: value if isinstance(value, (int, float, bool)) else str(value)
+                     for key, value in args.items()},
+        })
+    return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+
+def write_chrome_trace(path):
+    """Write the Chrome trace JSON to a path."""
+    with open(path, "w") as f:
+        json.dump(chrome_trace(), f)
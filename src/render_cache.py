@@ -0,0 +1,90 @@
+"""
+Content-addressed render cache for RunDown - reuses a previously encoded
+image when the data, label, theme, size and encoder settings are unchanged.
+"""
+
+import dataclasses
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+from pathlib import Path
+from typing import Optional
+
+
+def _to_json(value):
+    if dataclasses.is_dataclass(value):
+        return dataclasses.asdict(value)
+    return str(value)
+
+
+def content_digest(*parts) -> str:
+    """Stable SHA-256 digest of JSON-serialisable parts (dataclasses included)."""
+    payload = json.dumps(parts, default=_to_json, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class RenderCache:
+    """
+    Directory of encoded images named by digest, evicting the least recently
+    used entries once the total size exceeds ``max_bytes``.
+    """
+
+    def __init__(self, directory, max_bytes: int = 256 * 1024 * 1024):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+
+    def _path(self, digest: str, extension: str) -> Path:
+        return self.directory / f"{digest}.{extension}"
+
+    def get(self, digest: str, extension: str) -> Optional[Path]:
+        """Path of the cached image for a digest, or None on a miss."""
+        path = self._path(digest, extension)
+        try:
+            # Mark as recently used for eviction
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        return path
+
+    def fetch(self, digest: str, extension: str, output_path) -> bool:
+        """Copy the cached image to output_path; returns False on a miss."""
+        path = self.get(digest, extension)
+        if path is None:
+            return False
+        if Path(output_path).resolve() != path.resolve():
+            shutil.copyfile(path, output_path)
+        return True
+
+    def put(self, digest: str, extension: str, source_path):
+        """Store a copy of an encoded image, then evict old entries if needed."""
+        self.directory.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        os.close(fd)
+        shutil.copyfile(source_path, tmp_path)
+        # Atomic so concurrent workers never see a partial file
+        os.replace(tmp_path, self._path(digest, extension))
+        self.evict()
+
+    def evict(self):
+        """Remove least recently used entries until the cache fits max_bytes."""
+        entries = []
+        for path in self.directory.iterdir():
+            if path.suffix == ".tmp":
+                continue
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                pass
+            total -= size
@@ -0,0 +1,222 @@
+"""
+Route cache for RunDown - fetches an activity's GPS track once, simplifies it
+and keeps it on disk as a compact binary array for drawing route thumbnails.
+
+Tracks are stored as native-order float32 (lat, lng) pairs, one file per
+activity, so they can be memory-mapped and read without parsing. Activities
+without GPS (treadmill, manual entries) are stored as empty files so they are
+not requested again.
+"""
+
+import math
+import mmap
+import os
+import tempfile
+from array import array
+from pathlib import Path
+from typing import Dict, List, Sequence, Tuple
+
+# Tracks are simplified to this many steps across their longest side before
+# caching - finer than any thumbnail, so one cached track serves every size
+TRACK_RESOLUTION = 1000
+
+Point = Tuple[float, float]
+
+
+def simplify(points: Sequence[Point], tolerance: float) -> List[Point]:
+    """
+    Douglas-Peucker polyline simplification.
+
+    Args:
+        points: Planar (x, y) points
+        tolerance: Maximum distance of a dropped point from the simplified line
+
+    Returns:
+        The points that are kept, first and last always included
+    """
+    count = len(points)
+    if count < 3:
+        return list(points)
+
+    keep = [False] * count
+    keep[0] = keep[-1] = True
+    tolerance_sq = tolerance * tolerance
+    # Iterative so long tracks cannot hit the recursion limit
+    stack = [(0, count - 1)]
+    while stack:
+        first, last = stack.pop()
+        x1, y1 = points[first]
+        dx, dy = points[last][0] - x1, points[last][1] - y1
+        length_sq = dx * dx + dy * dy
+
+        max_dist_sq, index = -1.0, None
+        for i in range(first + 1, last):
+            px, py = points[i][0] - x1, points[i][1] - y1
+            if length_sq == 0:
+                dist_sq = px * px + py * py
+            else:
+                cross = dx * py - dy * px
+                dist_sq = cross * cross / length_sq
+            if dist_sq > max_dist_sq:
+                max_dist_sq, index = dist_sq, i
+
+        if index is not None and max_dist_sq > tolerance_sq:
+            keep[index] = True
+            stack.append((first, index))
+            stack.append((index, last))
+
+    return [point for point, kept in zip(points, keep) if kept]
+
+
+def project(track: Sequence[float]) -> List[Point]:
+    """Equirectangular (x, y) of interleaved lat/lng values, north up."""
+    if not track:
+        return []
+    lats = track[0::2]
+    scale = math.cos(math.radians(sum(lats) / len(lats)))
+    return [(lng * scale, -lat) for lat, lng in zip(lats, track[1::2])]
+
+
+def _simplify_track(latlng: Sequence[Sequence[float]]) -> array:
+    """Simplify a [lat, lng] stream to TRACK_RESOLUTION, as interleaved float32."""
+    flat = [value for point in latlng for value in point[:2]]
+    projected = project(flat)
+    if not projected:
+        return array('f')
+    xs, ys = [p[0] for p in projected], [p[1] for p in projected]
+    span = max(max(xs) - min(xs), max(ys) - min(ys))
+
+    # Keep the original lat/lng of the points the projected simplification keeps
+    index_of = {point: i for i, point in enumerate(projected)}
+    kept = simplify(projected, span / TRACK_RESOLUTION) if span > 0 else projected[:1]
+    track = array('f')
+    for point in kept:
+        i = index_of[point]
+        track.extend(flat[2 * i:2 * i + 2])
+    return track
+
+
+def thumbnail(track: Sequence[float], width: int, height: int,
+              tolerance: float = 1.0) -> List[Tuple[int, int]]:
+    """
+    Fit a track into a width x height box (aspect kept, centred) and simplify
+    it to pixel resolution.
+
+    Returns:
+        Integer pixel points relative to the box's top-left corner
+    """
+    projected = project(track)
+    if len(projected) < 2:
+        return []
+    xs, ys = [p[0] for p in projected], [p[1] for p in projected]
+    min_x, min_y = min(xs), min(ys)
+    span_x, span_y = max(xs) - min_x, max(ys) - min_y
+    if span_x == 0 and span_y == 0:
+        return []
+
+    scale = min(width / span_x if span_x else math.inf, height / span_y if span_y else math.inf)
+    offset_x = (width - span_x * scale) / 2
+    offset_y = (height - span_y * scale) / 2
+    pixels = [((x - min_x) * scale + offset_x, (y - min_y) * scale + offset_y) for x, y in projected]
+
+    points = []
+    for x, y in simplify(pixels, tolerance):
+        point = (round(x), round(y))
+        if not points or points[-1] != point:
+            points.append(point)
+    return points
+
+
+def _is_not_found(error: Exception) -> bool:
+    """Whether a fetch error means the activity has no streams (stravalib or aiohttp)."""
+    return type(error).__name__ == "ObjectNotFound" or getattr(error, "status", None) == 404
+
+
+class RouteCache:
+    """Directory of simplified tracks named by activity id."""
+
+    def __init__(self, directory):
+        self.directory = Path(directory)
+
+    def _path(self, activity_id) -> Path:
+        return self.directory / f"{int(activity_id)}.f32"
+
+    def get(self, activity_id):
+        """
+        The cached track as a memory-mapped float32 view of interleaved
+        lat/lng values (empty without GPS), or None if it was never fetched.
+        """
+        path = self._path(activity_id)
+        try:
+            with open(path, "rb") as f:
+                if os.fstat(f.fileno()).st_size == 0:
+                    return array('f')
+                # The view keeps the mapping alive after the file is closed
+                return memoryview(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)).cast('f')
+        except FileNotFoundError:
+            return None
+
+    def put(self, activity_id, track: array):
+        """Store a track atomically so concurrent workers never see a partial file."""
+        self.directory.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            track.tofile(f)
+        os.replace(tmp_path, self._path(activity_id))
+
+    def fetch(self, client, activity_id):
+        """
+        The simplified track of an activity, fetched and cached on first use.
+
+        Args:
+            client: stravalib Client (or AsyncFetchClient) with get_activity_streams()
+            activity_id: Strava activity id
+
+        Returns:
+            Interleaved lat/lng float32 values, empty for activities without GPS
+        """
+        track = self.get(activity_id)
+        if track is not None:
+            return track
+
+        try:
+            streams = client.get_activity_streams(activity_id, types=["latlng"], resolution="medium")
+        except Exception as e:
+            if not _is_not_found(e):
+                raise
+            streams = None
+
+        stream = streams.get("latlng") if streams else None
+        # stravalib returns Stream models, the async client plain lists
+        latlng = getattr(stream, "data", stream) or []
+        track = _simplify_track(latlng)
+        self.put(activity_id, track)
+        return track
+
+
+def card_routes(route_cache: RouteCache, client, runs: Dict, size: Tuple[int, int]) -> Dict[str, List]:
+    """
+    Route thumbnails for a card's highlighted runs.
+
+    Args:
+        route_cache: Cache the tracks are fetched through
+        client: Client used for fetching
+        runs: Mapping of data key (e.g. "longest_run") to run record or None
+        size: Thumbnail box as (width, height)
+
+    Returns:
+        Pixel points keyed like ``runs``, for the runs that have a route
+    """
+    routes = {}
+    for key, run in runs.items():
+        if run is None:
+            continue
+        try:
+            track = route_cache.fetch(client, run.id)
+        except Exception as e:
+            print(f"Route unavailable for {run.name}: {e}")
+            continue
+        points = thumbnail(track, *size)
+        if points:
+            routes[key] = points
+    return routes
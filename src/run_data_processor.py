@@ -1,3 +1,4 @@
+from array import array
 from dataclasses import dataclass
 from typing import List, Dict, Optional
 
@@ -12,73 +13,185 @@ class FormattedRun:
     start_time: str
 
 
-def _format_run(run) -> FormattedRun:
-    # Format duration
-    hours, rem = divmod(run.moving_time, 3600)
+@dataclass
+class RunStats:
+    """Numeric aggregate of a set of runs; formatting happens in format_stats()."""
+    total_runs: int = 0
+    total_distance: float = 0.0  # Metres
+    total_moving_time: int = 0  # Seconds
+    # Indices into the folded sequence, used by RunDataProcessor to pick the runs
+    longest_index: Optional[int] = None  # Index of the longest run
+    fastest_index: Optional[int] = None  # Index of the run with the best pace
+
+    @property
+    def total_distance_km(self) -> float:
+        return self.total_distance / 1000
+
+    @property
+    def average_pace(self) -> Optional[float]:
+        """Average pace in seconds per km, or None without distance."""
+        if self.total_distance > 0:
+            return self.total_moving_time / self.total_distance_km
+        return None
+
+
+class RunColumns:
+    """Compact column store of the numeric run fields used for aggregation."""
+
+    def __init__(self):
+        self.distance = array('d')  # Metres
+        self.moving_time = array('q')  # Seconds
+
+    def __len__(self):
+        return len(self.distance)
+
+    def append(self, run):
+        self.distance.append(float(run.distance))
+        self.moving_time.append(int(run.moving_time))
+
+    @classmethod
+    def from_runs(cls, runs) -> "RunColumns":
+        columns = cls()
+        for run in runs:
+            columns.append(run)
+        return columns
+
+
+class RunAccumulator:
+    """
+    Online fold of runs into RunStats.
+
+    Runs are added one at a time and only the running totals plus the current
+    longest and fastest candidates are kept, so arbitrarily long activity
+    streams are summarised in constant memory.
+    """
+
+    def __init__(self):
+        self.stats = RunStats()
+        self.longest_run = None
+        self.fastest_run = None
+        self._longest_distance = None
+        self._best_pace = None
+
+    def add_values(self, distance: float, moving_time: int):
+        """Fold one run's numbers in; returns (is_longest, is_fastest)."""
+        stats = self.stats
+        index = stats.total_runs
+        stats.total_runs += 1
+        stats.total_distance += distance
+        stats.total_moving_time += moving_time
+
+        is_longest = self._longest_distance is None or distance > self._longest_distance
+        if is_longest:
+            stats.longest_index, self._longest_distance = index, distance
+
+        is_fastest = False
+        if distance > 0:
+            pace = moving_time / (distance / 1000)
+            is_fastest = self._best_pace is None or pace < self._best_pace
+            if is_fastest:
+                stats.fastest_index, self._best_pace = index, pace
+
+        return is_longest, is_fastest
+
+    def add(self, run):
+        """Fold a single run into the totals."""
+        is_longest, is_fastest = self.add_values(float(run.distance), int(run.moving_time))
+        if is_longest:
+            self.longest_run = run
+        if is_fastest:
+            self.fastest_run = run
+
+    def extend(self, runs):
+        """Fold every run of an iterable, consuming it lazily."""
+        for run in runs:
+            self.add(run)
+        return self
+
+    def result(self) -> Dict:
+        """Formatted data for visualization, as returned by process_runs()."""
+        return format_stats(self.stats, self.longest_run, self.fastest_run)
+
+
+def aggregate(columns: RunColumns) -> RunStats:
+    """Compute totals, longest and fastest run in a single pass over the columns."""
+    accumulator = RunAccumulator()
+    for distance, moving_time in zip(columns.distance, columns.moving_time):
+        accumulator.add_values(distance, moving_time)
+    return accumulator.stats
+
+
+def format_duration(seconds: int) -> str:
+    """Format seconds as H:MM:SS, or M:SS under an hour."""
+    hours, rem = divmod(int(seconds), 3600)
     minutes, seconds = divmod(rem, 60)
-    duration_str = (f"{hours}:{minutes:02d}:{seconds:02d}"
-                    if hours > 0 else f"{minutes}:{seconds:02d}")
+    return (f"{hours}:{minutes:02d}:{seconds:02d}"
+            if hours > 0 else f"{minutes}:{seconds:02d}")
+
+
+def format_pace(seconds_per_km: Optional[float]) -> str:
+    """Format a pace in seconds per km as M:SS /KM."""
+    if not seconds_per_km:
+        return "0:00 /KM"
+    pace_min, pace_sec = divmod(int(seconds_per_km), 60)
+    return f"{pace_min}:{pace_sec:02d} /KM"
+
 
-    # Format pace
-    if run.distance > 0:
-        pace_seconds = run.moving_time / (run.distance / 1000)
-        pace_min, pace_sec = divmod(int(pace_seconds), 60)
-        pace_str = f"{pace_min}:{pace_sec:02d} /KM"  # Added /KM unit
-    else:
-        pace_str = "0:00 /KM"  # Added /KM unit
+def _format_run(run) -> Optional[FormattedRun]:
+    if run is None:
+        return None
+
+    pace_seconds = run.moving_time / (run.distance / 1000) if run.distance > 0 else None
 
     return FormattedRun(
         name=run.name,
         date=run.start_date.date().strftime("%d %b %Y"),
         distance_km=f"{round(run.distance / 1000, 2)} KM",  # Added km unit
-        duration_str=duration_str,
-        pace_str=pace_str,
+        duration_str=format_duration(run.moving_time),
+        pace_str=format_pace(pace_seconds),
         start_time=run.start_date.time().strftime("%H:%M")
     )
 
 
+def format_stats(stats: RunStats, longest_run=None, fastest_run=None) -> Dict:
+    """Format numeric stats and the highlighted runs into display strings."""
+    return {
+        "summary_stats": {
+            "total_runs": stats.total_runs,
+            "total_distance_km": f"{round(stats.total_distance_km, 1)} KM",  # Added km unit
+            "total_duration": format_duration(stats.total_moving_time),
+            "average_pace": format_pace(stats.average_pace)
+        },
+        "longest_run": _format_run(longest_run),
+        "fastest_run": _format_run(fastest_run)
+    }
+
+
 class RunDataProcessor:
     def __init__(self, runs: List):
         self.runs = runs
 
+    def compute_stats(self) -> RunStats:
+        """Aggregates the runs into numeric stats"""
+        return aggregate(RunColumns.from_runs(self.runs))
+
     def process_runs(self) -> Dict:
         """Processes runs and returns formatted data for visualization"""
-        return {
-            "summary_stats": self._get_summary_stats(),
-            "longest_run": self._get_longest_run(),
-            "fastest_run": self._get_fastest_run()
-        }
-
-    def _get_summary_stats(self) -> Dict:
-        total_seconds = sum(r.moving_time for r in self.runs)
-        total_distance_km = sum(r.distance for r in self.runs) / 1000
-
-        # Format total duration
-        hours, rem = divmod(total_seconds, 3600)
-        minutes, seconds = divmod(rem, 60)
-        duration_str = (f"{hours}:{minutes:02d}:{seconds:02d}"
-                        if hours > 0 else f"{minutes}:{seconds:02d}")
-
-        # Calculate average pace
-        if total_distance_km > 0:
-            pace_seconds_per_km = total_seconds / total_distance_km
-            pace_min, pace_sec = divmod(int(pace_seconds_per_km), 60)
-            avg_pace = f"{pace_min}:{pace_sec:02d} /KM"  # Added /KM unit
-        else:
-            avg_pace = "0:00 /KM"  # Added /KM unit
-
-        return {
-            "total_runs": len(self.runs),
-            "total_distance_km": f"{round(total_distance_km, 1)} KM",  # Added km unit
-            "total_duration": duration_str,
-            "average_pace": avg_pace
-        }
-
-    def _get_longest_run(self) -> Optional[FormattedRun]:
-        return _format_run(max(self.runs, key=lambda r: r.distance, default=None))
-
-    def _get_fastest_run(self) -> Optional[FormattedRun]:
-        valid_runs = [r for r in self.runs if r.distance > 0]
-        return _format_run(min(valid_runs,
-                               key=lambda r: r.moving_time / (r.distance / 1000),
-                               default=None))
\ No newline at end of file
+        stats = self.compute_stats()
+        return format_stats(
+            stats,
+            self.runs[stats.longest_index] if stats.longest_index is not None else None,
+            self.runs[stats.fastest_index] if stats.fastest_index is not None else None
+        )
+
+
+def process_run_stream(activities) -> RunAccumulator:
+    """
+    Filter runs out of an activity iterable and fold them as they arrive.
+
+    Nothing but the accumulator's totals and current candidates is retained, so
+    a paginated stravalib iterator can be summarised without materialising it.
+    """
+    return RunAccumulator().extend(
+        activity for activity in activities if activity.type == 'Run'
+    )
@@ -0,0 +1,53 @@
+"""
+Lightweight run records for RunDown - the handful of activity fields the
+processor and caches use, without keeping stravalib models alive.
+"""
+
+from datetime import datetime, timezone
+
+
+def activity_type(activity) -> str:
+    """Get an activity's type as a plain string."""
+    # stravalib wraps the type in a RelaxedActivityType model
+    value = activity.type
+    return str(getattr(value, "root", value))
+
+
+class RunRecord:
+    """
+    Slotted record of an activity's id, name, type, distance (metres),
+    moving time (seconds) and timezone-aware start date.
+    """
+
+    __slots__ = ("id", "name", "type", "distance", "moving_time", "start_date")
+
+    def __init__(self, id: int, name: str, type: str, distance: float,
+                 moving_time: int, start_date: datetime):
+        self.id = id
+        self.name = name
+        self.type = type
+        self.distance = distance
+        self.moving_time = moving_time
+        self.start_date = start_date
+
+    @classmethod
+    def from_activity(cls, activity) -> "RunRecord":
+        """Project a stravalib activity (or anything with the same attributes) into a record."""
+        return cls(
+            int(activity.id),
+            activity.name or "",
+            activity_type(activity),
+            float(activity.distance or 0),
+            int(activity.moving_time or 0),
+            # Normalise pydantic's TzInfo so records don't hold on to model objects
+            activity.start_date.astimezone(timezone.utc)
+        )
+
+    def __eq__(self, other):
+        if not isinstance(other, RunRecord):
+            return NotImplemented
+        return all(getattr(self, name) == getattr(other, name) for name in self.__slots__)
+
+    def __repr__(self):
+        fields = ", ".join(f"{name}={getattr(self, name)!r}" for name in self.__slots__)
+        return f"RunRecord({fields})"
@@ -0,0 +1,258 @@
+"""
+Local render service for RunDown - a long-running HTTP server that keeps the
+Strava client, fonts and card templates warm between requests.
+
+    GET /card?week=2024-03-11[&label=...][&size=square]
+                                            PNG (or the configured format) for that week
+    GET /stats?week=2024-03-11              JSON stats for that week
+    GET /load?day=2024-03-17                JSON rolling training load as of that day
+    GET /health                             "ok"
+
+Concurrent requests for the same card are coalesced into a single render.
+One activity store stays open for the life of the service, and a week is
+re-synced with Strava at most once per RESYNC_INTERVAL.
+"""
+
+import io
+import json
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from dataclasses import replace
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, Hashable, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+from src.activity_store import ActivityStore
+from src.date_utils import get_week_range, parse_date_input
+from src.export import stats_to_dict
+from src.generate_image import ENCODER_PRESETS, StravaStatsImage
+from src.run_data_processor import RunAccumulator
+from src.route_cache import card_routes
+from src.training_load import TrainingLoad, history_range
+
+CONTENT_TYPES = {"PNG": "image/png", "WEBP": "image/webp", "JPEG": "image/jpeg"}
+
+# Seconds a synced range is served from the store before Strava is asked again
+RESYNC_INTERVAL = 5 * 60
+
+
+class RequestCoalescer:
+    """Runs one call per key at a time; concurrent callers share its result."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._in_flight: Dict[Hashable, Future] = {}
+
+    def run(self, key: Hashable, fn: Callable):
+        with self._lock:
+            future = self._in_flight.get(key)
+            owner = future is None
+            if owner:
+                future = Future()
+                self._in_flight[key] = future
+        if not owner:
+            return future.result()
+
+        try:
+            result = fn()
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                del self._in_flight[key]
+
+
+class CardService:
+    """
+    Warm state shared by all requests: the authenticated client, the activity
+    store, loaded fonts and an in-memory LRU of encoded cards keyed by digest.
+    With a ``route_cache`` the run cards get route thumbnails.
+
+    Each date range is synced at most once per ``resync_interval`` seconds;
+    concurrent requests for a range share one sync.
+    """
+
+    def __init__(self, client, store_path, encoder=None, cache_size: int = 128, route_cache=None,
+                 resync_interval: float = RESYNC_INTERVAL):
+        self.client = client
+        self.store_path = store_path
+        self.store = ActivityStore(store_path, check_same_thread=False)
+        self.route_cache = route_cache
+        self.resync_interval = resync_interval
+        self._synced_at: Dict[Tuple[float, float], float] = {}
+        encoder = encoder or ENCODER_PRESETS["default"]
+        # Cards are encoded in memory, so the format cannot come from a file name
+        self.encoder = replace(encoder, format=encoder.format or "PNG")
+        self.fonts = StravaStatsImage.load_fonts()
+        self.cache_size = cache_size
+        self._cards: "OrderedDict[str, bytes]" = OrderedDict()
+        self._store_lock = threading.Lock()
+        self._render_lock = threading.Lock()
+        self._coalescer = RequestCoalescer()
+
+    def close(self):
+        with self._store_lock:
+            self.store.close()
+
+    def _sync(self, start_date, end_date):
+        """Sync a range unless it was synced within the last resync_interval."""
+        key = (start_date.timestamp(), end_date.timestamp())
+
+        def sync():
+            if time.monotonic() - self._synced_at.get(key, float("-inf")) < self.resync_interval:
+                return
+            with self._store_lock:
+                self.store.sync(self.client, start_date, end_date)
+            self._synced_at[key] = time.monotonic()
+
+        self._coalescer.run(("sync",) + key, sync)
+
+    @property
+    def content_type(self) -> str:
+        return CONTENT_TYPES.get(self.encoder.format.upper(), "application/octet-stream")
+
+    def week_stats(self, week_date: str) -> Tuple[RunAccumulator, object, object, Dict]:
+        """
+        Fold the runs of the week containing week_date.
+
+        Returns:
+            Tuple of (accumulator, start, end, personal-record badges)
+        """
+        start_date, end_date = get_week_range(parse_date_input(week_date))
+        self._sync(start_date, end_date)
+        with self._store_lock:
+            accumulator = RunAccumulator().extend(self.store.iter_runs(start_date, end_date))
+            badges = self.store.records.badges(accumulator.longest_run, accumulator.fastest_run)
+        return accumulator, start_date, end_date, badges
+
+    def stats(self, week_date: str) -> Dict:
+        accumulator, start_date, end_date, _ = self.week_stats(week_date)
+        return stats_to_dict(accumulator, start_date, end_date)
+
+    def load(self, day: str) -> Dict:
+        """Rolling training load as of a day."""
+        end_day = parse_date_input(day)
+        start_date, end_date = history_range(end_day)
+        self._sync(start_date, end_date)
+        with self._store_lock:
+            load = TrainingLoad.from_runs(self.store.iter_runs(start_date, end_date), start_date, end_date)
+        return load.summary(end_day)
+
+    def card(self, week_date: str, label: Optional[str] = None, size: Optional[str] = None) -> bytes:
+        """
+        Encoded card for a week in a named size (StravaStatsImage.OUTPUT_SIZES,
+        default story); concurrent requests for the same card share one render.
+
+        A size is rendered together with the sizes sharing its drawn image
+        (story and thumbnail), so asking for another of them is a cache hit.
+        """
+        size = size or StravaStatsImage.DEFAULT_SIZE
+        if size not in StravaStatsImage.OUTPUT_SIZES:
+            raise ValueError(f"Unknown size: {size}. Use one of {', '.join(StravaStatsImage.OUTPUT_SIZES)}.")
+        family = tuple(StravaStatsImage.size_family(size))
+        cards = self._coalescer.run((week_date, label, family),
+                                    lambda: self._render_cards(week_date, label, family))
+        return cards[size]
+
+    def _cache(self, digest: str, image: bytes):
+        self._cards[digest] = image
+        self._cards.move_to_end(digest)
+        if len(self._cards) > self.cache_size:
+            self._cards.popitem(last=False)
+
+    def _render_cards(self, week_date: str, label: Optional[str], sizes: Tuple[str, ...]) -> Dict[str, bytes]:
+        """Encoded cards for a week in sizes drawn from one render, from the cache when unchanged."""
+        accumulator, start_date, end_date, badges = self.week_stats(week_date)
+        week_label = label or f"{start_date.strftime('%b %d')} - {end_date.strftime('%b %d, %Y')}"
+        data = accumulator.result()
+        if badges:
+            data["badges"] = badges
+        if self.route_cache is not None:
+            routes = card_routes(self.route_cache, self.client, {
+                "longest_run": accumulator.longest_run,
+                "fastest_run": accumulator.fastest_run,
+            }, StravaStatsImage.ROUTE_SIZE)
+            if routes:
+                data["routes"] = routes
+
+        digests = {size: StravaStatsImage.cache_key(data, week_label, self.encoder, self.encoder.extension, size)
+                   for size in sizes}
+        with self._render_lock:
+            cached = {size: self._cards.get(digest) for size, digest in digests.items()}
+            if all(image is not None for image in cached.values()):
+                for digest in digests.values():
+                    self._cards.move_to_end(digest)
+                return cached
+
+            buffers = {size: io.BytesIO() for size in sizes}
+            cards = StravaStatsImage.render_sizes(data, week_label, buffers, self.encoder, self.fonts)
+            images = {}
+            for size, card in cards.items():
+                card.save()
+                images[size] = buffers[size].getvalue()
+                self._cache(digests[size], images[size])
+        return images
+
+
+class CardRequestHandler(BaseHTTPRequestHandler):
+    server_version = "RunDown"
+
+    def _send(self, status: int, body: bytes, content_type: str):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _error(self, status: int, message: str):
+        self._send(status, json.dumps({"error": message}).encode("utf-8"), "application/json")
+
+    def do_GET(self):
+        service: CardService = self.server.service
+        url = urlparse(self.path)
+        query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+
+        if url.path == "/health":
+            self._send(200, b"ok", "text/plain")
+            return
+        if url.path not in ("/card", "/stats", "/load"):
+            self._error(404, f"Unknown path: {url.path}")
+            return
+        param = "day" if url.path == "/load" else "week"
+        if param not in query:
+            self._error(400, f"Missing required parameter: {param} (YYYY-MM-DD)")
+            return
+
+        try:
+            if url.path == "/card":
+                self._send(200, service.card(query["week"], query.get("label"), query.get("size")),
+                           service.content_type)
+                return
+            if url.path == "/stats":
+                result = service.stats(query["week"])
+            else:
+                result = service.load(query["day"])
+            self._send(200, json.dumps(result, indent=2).encode("utf-8"), "application/json")
+        except ValueError as e:
+            self._error(400, str(e))
+        except Exception as e:
+            self._error(500, str(e))
+
+
+def serve(service: CardService, host: str = "127.0.0.1", port: int = 8000):
+    """Serve cards until interrupted."""
+    server = ThreadingHTTPServer((host, port), CardRequestHandler)
+    server.daemon_threads = True
+    server.service = service
+    print(f"Serving cards on http://{host}:{server.server_port}/card?week=YYYY-MM-DD")
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+        service.close()
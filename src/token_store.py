@@ -0,0 +1,215 @@
+"""
+Per-athlete token store for RunDown - keeps OAuth tokens for many athletes in
+SQLite so one checkout can generate cards for a whole club.
+
+Refreshes are serialised per athlete (a thread lock plus an immediate SQLite
+transaction across processes) and re-read the stored tokens first, so an
+athlete's token is refreshed once even when several workers find it expired.
+Strava may rotate the refresh token on every refresh, which is why two
+concurrent refreshes must never both use the old one.
+"""
+
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from stravalib import Client, exc
+
+from src.auth import REFRESH_MARGIN, _exchange_code, load_env
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS athletes (
+    athlete_id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    access_token TEXT NOT NULL,
+    refresh_token TEXT NOT NULL,
+    expires_at REAL NOT NULL
+);
+"""
+
+
+@dataclass
+class AthleteTokens:
+    athlete_id: int
+    name: str
+    access_token: str
+    refresh_token: str
+    expires_at: float  # Unix timestamp
+
+    def expires_soon(self, margin: float = REFRESH_MARGIN) -> bool:
+        return time.time() > self.expires_at - margin
+
+
+def _refresh_tokens(refresh_token: str) -> Dict:
+    """Exchange a refresh token for new tokens using the app credentials from .env."""
+    load_env()
+    return Client().refresh_access_token(
+        client_id=os.getenv('STRAVA_CLIENT_ID'),
+        client_secret=os.getenv('STRAVA_CLIENT_SECRET'),
+        refresh_token=refresh_token
+    )
+
+
+class TokenStore:
+    """SQLite-backed tokens, one row per athlete."""
+
+    def __init__(self, path, refresh=_refresh_tokens):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.refresh = refresh
+        self._local = threading.local()
+        self._locks: Dict[int, threading.Lock] = {}
+        self._locks_guard = threading.Lock()
+        self._conn().executescript(SCHEMA)
+
+    def _conn(self) -> sqlite3.Connection:
+        """This thread's connection; transactions are managed explicitly."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(str(self.path), timeout=60, isolation_level=None)
+            self._local.conn = conn
+        return conn
+
+    def _lock(self, athlete_id: int) -> threading.Lock:
+        with self._locks_guard:
+            return self._locks.setdefault(athlete_id, threading.Lock())
+
+    def _read(self, conn, athlete_id: int) -> Optional[AthleteTokens]:
+        row = conn.execute(
+            "SELECT athlete_id, name, access_token, refresh_token, expires_at "
+            "FROM athletes WHERE athlete_id = ?", (athlete_id,)
+        ).fetchone()
+        return AthleteTokens(*row) if row else None
+
+    def _write(self, conn, tokens: AthleteTokens):
+        conn.execute(
+            "INSERT OR REPLACE INTO athletes "
+            "(athlete_id, name, access_token, refresh_token, expires_at) VALUES (?, ?, ?, ?, ?)",
+            (tokens.athlete_id, tokens.name, tokens.access_token, tokens.refresh_token, tokens.expires_at)
+        )
+
+    def save(self, tokens: AthleteTokens):
+        """Insert or replace an athlete's tokens."""
+        self._write(self._conn(), tokens)
+
+    def get(self, athlete_id: int) -> Optional[AthleteTokens]:
+        return self._read(self._conn(), int(athlete_id))
+
+    def athletes(self) -> List[AthleteTokens]:
+        """Every stored athlete, ordered by id."""
+        rows = self._conn().execute(
+            "SELECT athlete_id, name, access_token, refresh_token, expires_at "
+            "FROM athletes ORDER BY athlete_id"
+        )
+        return [AthleteTokens(*row) for row in rows]
+
+    def remove(self, athlete_id: int):
+        self._conn().execute("DELETE FROM athletes WHERE athlete_id = ?", (int(athlete_id),))
+
+    def fresh_tokens(self, athlete_id: int, stale_access_token: Optional[str] = None,
+                     margin: float = REFRESH_MARGIN) -> AthleteTokens:
+        """
+        An athlete's tokens, refreshed first if they are about to expire.
+
+        Args:
+            athlete_id: Strava athlete id
+            stale_access_token: Access token Strava just rejected; refreshed
+                unless another worker already replaced it
+            margin: Refresh this many seconds before the stored expiry
+
+        Returns:
+            The current tokens
+
+        Raises:
+            KeyError: If the athlete is not in the store
+        """
+        athlete_id = int(athlete_id)
+        with self._lock(athlete_id):
+            conn = self._conn()
+            # Take the write lock before reading so other processes wait for our refresh
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                tokens = self._read(conn, athlete_id)
+                if tokens is None:
+                    raise KeyError(f"Athlete {athlete_id} is not in the token store")
+                if tokens.expires_soon(margin) or tokens.access_token == stale_access_token:
+                    response = self.refresh(tokens.refresh_token)
+                    tokens.access_token = response['access_token']
+                    tokens.refresh_token = response['refresh_token']
+                    tokens.expires_at = float(response['expires_at'])
+                    self._write(conn, tokens)
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        return tokens
+
+    def client_for(self, athlete_id: int) -> Client:
+        """
+        A stravalib client for an athlete whose token is kept fresh through the store.
+
+        Every request refreshes through the store when the token is about to
+        expire, and a 401 triggers one store refresh and a retry.
+        """
+        athlete_id = int(athlete_id)
+        client = Client()
+
+        def apply(tokens: AthleteTokens):
+            client.access_token = tokens.access_token
+            client.refresh_token = tokens.refresh_token
+            client.token_expires = tokens.expires_at
+
+        apply(self.fresh_tokens(athlete_id))
+        request = client.protocol._request
+
+        def _request(url, *args, **kwargs):
+            if "/oauth/token" in url:
+                return request(url, *args, **kwargs)
+            if time.time() > client.token_expires - REFRESH_MARGIN:
+                apply(self.fresh_tokens(athlete_id))
+            try:
+                return request(url, *args, **kwargs)
+            except exc.AccessUnauthorized:
+                apply(self.fresh_tokens(athlete_id, stale_access_token=client.access_token))
+                return request(url, *args, **kwargs)
+
+        client.protocol._request = _request
+        return client
+
+    def token_provider(self, athlete_id: int):
+        """
+        Access-token callback for an athlete, for fetch layers that bypass
+        stravalib (see auth.token_provider); refreshes go through the store.
+        """
+        athlete_id = int(athlete_id)
+
+        def access_token(stale=None):
+            return self.fresh_tokens(athlete_id, stale_access_token=stale).access_token
+
+        return access_token
+
+
+def authorize_athlete(store: TokenStore) -> AthleteTokens:
+    """Run the interactive OAuth flow for an athlete and add them to the store."""
+    load_env()
+    client = Client()
+    token_response, athlete = _exchange_code(client, scope=('read', 'activity:read_all'),
+                                             return_athlete=True)
+    client.access_token = token_response['access_token']
+    if athlete is None:
+        athlete = client.get_athlete()
+
+    name = " ".join(part for part in (athlete.firstname, athlete.lastname) if part) or str(athlete.id)
+    tokens = AthleteTokens(
+        athlete_id=int(athlete.id),
+        name=name,
+        access_token=token_response['access_token'],
+        refresh_token=token_response['refresh_token'],
+        expires_at=float(token_response['expires_at'])
+    )
+    store.save(tokens)
+    return tokens
@@ -0,0 +1,207 @@
+"""
+Training load analytics for RunDown - a daily-binned run series with prefix
+sums, so rolling totals, acute:chronic ratios and week-over-week deltas are
+answered in constant time for any window over any history length.
+"""
+
+from array import array
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta, timezone
+from typing import Dict, Iterable, List, Optional, Sequence, Union
+
+ROLLING_WINDOWS = (7, 28, 365)
+ACUTE_DAYS = 7
+CHRONIC_DAYS = 28
+METRICS = ("distance", "moving_time", "runs")
+# Days of history needed for every window in summary(), including the previous week
+HISTORY_DAYS = max(max(ROLLING_WINDOWS), CHRONIC_DAYS, 14)
+
+Day = Union[date, datetime]
+
+
+def _to_day(value: Day) -> date:
+    """UTC calendar day of a date or datetime (naive datetimes are taken as UTC)."""
+    if isinstance(value, datetime):
+        if value.tzinfo is not None:
+            value = value.astimezone(timezone.utc)
+        return value.date()
+    return value
+
+
+def history_range(end_day: Day):
+    """
+    The span of activities summary() needs for a day.
+
+    Returns:
+        Tuple of (start, end) as timezone-aware datetimes covering whole UTC days
+    """
+    end_day = _to_day(end_day)
+    start = datetime.combine(end_day - timedelta(days=HISTORY_DAYS - 1), datetime.min.time(), timezone.utc)
+    end = datetime.combine(end_day, datetime.max.time(), timezone.utc)
+    return start, end
+
+
+@dataclass
+class WindowTotals:
+    """Run totals over a window of days ending on (and including) end_day."""
+    end_day: date
+    days: int
+    runs: int = 0
+    distance: float = 0.0  # Metres
+    moving_time: int = 0  # Seconds
+
+    @property
+    def distance_km(self) -> float:
+        return self.distance / 1000
+
+    def to_dict(self) -> Dict:
+        return {
+            "end_day": self.end_day.isoformat(),
+            "days": self.days,
+            "runs": self.runs,
+            "distance_km": round(self.distance_km, 3),
+            "moving_time_s": self.moving_time,
+        }
+
+
+class TrainingLoad:
+    """
+    Daily run totals stored as prefix sums.
+
+    ``_distance[i]`` holds the distance of every run before day ``first_day + i``,
+    so the total of any window is the difference of two entries. Days outside
+    the series count as zero, so windows may extend past either end.
+    """
+
+    def __init__(self, first_day: date, daily_distance: Sequence[float] = (),
+                 daily_moving_time: Sequence[int] = (), daily_runs: Sequence[int] = ()):
+        self.first_day = first_day
+        self._distance = array('d', [0.0])
+        self._moving_time = array('q', [0])
+        self._runs = array('q', [0])
+        for distance, moving_time, runs in zip(daily_distance, daily_moving_time, daily_runs):
+            self._distance.append(self._distance[-1] + distance)
+            self._moving_time.append(self._moving_time[-1] + moving_time)
+            self._runs.append(self._runs[-1] + runs)
+
+    def __len__(self):
+        """Number of days in the series."""
+        return len(self._distance) - 1
+
+    @property
+    def last_day(self) -> date:
+        return self.first_day + timedelta(days=len(self) - 1)
+
+    @classmethod
+    def from_runs(cls, activities: Iterable, start: Optional[Day] = None,
+                  end: Optional[Day] = None) -> "TrainingLoad":
+        """
+        Bin runs by UTC start day (non-run activities are skipped).
+
+        Args:
+            activities: Iterable of stravalib activities or run records
+            start: First day of the series (default: day of the earliest run)
+            end: Last day of the series (default: day of the latest run)
+
+        Returns:
+            TrainingLoad covering start..end
+        """
+        bins = {}
+        for activity in activities:
+            if activity.type != 'Run':
+                continue
+            day = _to_day(activity.start_date).toordinal()
+            distance, moving_time, runs = bins.get(day, (0.0, 0, 0))
+            bins[day] = (distance + float(activity.distance),
+                         moving_time + int(activity.moving_time), runs + 1)
+
+        first = _to_day(start).toordinal() if start is not None else min(bins, default=None)
+        last = _to_day(end).toordinal() if end is not None else max(bins, default=None)
+        if first is None or last is None:
+            today = datetime.now(timezone.utc).date()
+            return cls(_to_day(start) if start is not None else today)
+
+        empty = (0.0, 0, 0)
+        days = [bins.get(day, empty) for day in range(first, last + 1)]
+        return cls(
+            date.fromordinal(first),
+            [d[0] for d in days], [d[1] for d in days], [d[2] for d in days]
+        )
+
+    def daily(self, metric: str = "distance") -> List:
+        """Per-day values of a metric over the whole series, first_day first."""
+        if metric not in METRICS:
+            raise ValueError(f"Unknown metric: {metric}. Use one of: {', '.join(METRICS)}")
+        prefix = getattr(self, f"_{metric}")
+        return [prefix[i + 1] - prefix[i] for i in range(len(self))]
+
+    def _index(self, day: date) -> int:
+        """Prefix index of the start of a day, clamped to the series."""
+        return min(max((day - self.first_day).days, 0), len(self))
+
+    def window(self, end_day: Day, days: int) -> WindowTotals:
+        """Totals over the ``days`` days ending on end_day, inclusive."""
+        end_day = _to_day(end_day)
+        stop = self._index(end_day + timedelta(days=1))
+        start = self._index(end_day - timedelta(days=days - 1))
+        return WindowTotals(
+            end_day=end_day,
+            days=days,
+            runs=self._runs[stop] - self._runs[start],
+            distance=self._distance[stop] - self._distance[start],
+            moving_time=self._moving_time[stop] - self._moving_time[start],
+        )
+
+    def rolling(self, end_day: Day, windows: Sequence[int] = ROLLING_WINDOWS) -> Dict[int, WindowTotals]:
+        """Totals for each rolling window length ending on end_day."""
+        return {days: self.window(end_day, days) for days in windows}
+
+    def acute_chronic_ratio(self, end_day: Day, acute: int = ACUTE_DAYS, chronic: int = CHRONIC_DAYS,
+                            metric: str = "distance") -> Optional[float]:
+        """
+        Acute:chronic workload ratio - average daily load over the acute window
+        divided by the average over the chronic window.
+
+        Args:
+            end_day: Last day of both windows
+            acute: Acute window length in days
+            chronic: Chronic window length in days
+            metric: "distance", "moving_time" or "runs"
+
+        Returns:
+            The ratio, or None without any chronic load
+        """
+        if metric not in METRICS:
+            raise ValueError(f"Unknown metric: {metric}. Use one of: {', '.join(METRICS)}")
+        acute_load = getattr(self.window(end_day, acute), metric) / acute
+        chronic_load = getattr(self.window(end_day, chronic), metric) / chronic
+        if chronic_load <= 0:
+            return None
+        return acute_load / chronic_load
+
+    def week_over_week(self, end_day: Day) -> Dict:
+        """The 7 days ending on end_day compared with the 7 days before."""
+        end_day = _to_day(end_day)
+        current = self.window(end_day, 7)
+        previous = self.window(end_day - timedelta(days=7), 7)
+        return {
+            "current": current.to_dict(),
+            "previous": previous.to_dict(),
+            "runs_delta": current.runs - previous.runs,
+            "distance_km_delta": round(current.distance_km - previous.distance_km, 3),
+            "moving_time_s_delta": current.moving_time - previous.moving_time,
+            "distance_change": (
+                round(current.distance / previous.distance - 1, 4) if previous.distance > 0 else None
+            ),
+        }
+
+    def summary(self, end_day: Day) -> Dict:
+        """JSON-serialisable training load view for a day."""
+        end_day = _to_day(end_day)
+        ratio = self.acute_chronic_ratio(end_day)
+        return {
+            "day": end_day.isoformat(),
+            "rolling": {f"{days}d": totals.to_dict() for days, totals in self.rolling(end_day).items()},
+            "acute_chronic_ratio": round(ratio, 3) if ratio is not None else None,
+            "week_over_week": self.week_over_week(end_day),
+        }
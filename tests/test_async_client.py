@@ -0,0 +1,85 @@
+"""
+AsyncFetchClient paces consecutive calls with one rate-limit scheduler, so the
+usage Strava reports to one call throttles the next.
+
+    python -m unittest discover tests
+"""
+
+import asyncio
+import os
+import sys
+import threading
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.async_client import SHORT_WINDOW, AsyncFetchClient, RateLimitScheduler, aiohttp  # noqa: E402
+
+if aiohttp is not None:
+    from aiohttp import web
+
+# Strava reports 99 of 100 short-window requests used after every response
+RATE_LIMIT_HEADERS = {"X-RateLimit-Limit": "100,1000", "X-RateLimit-Usage": "99,120"}
+ACTIVITY = {"id": 1, "name": "Morning Run", "type": "Run", "distance": 5000,
+            "moving_time": 1500, "start_date": "2024-03-12T07:00:00Z"}
+
+
+@unittest.skipIf(aiohttp is None, "aiohttp is not installed")
+class SharedSchedulerTest(unittest.TestCase):
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        app = web.Application()
+        app.router.add_get("/athlete/activities", self.activities)
+        app.router.add_get("/activities/{id}/streams", self.streams)
+        self.runner = web.AppRunner(app)
+        self.loop.run_until_complete(self.runner.setup())
+        site = web.TCPSite(self.runner, "127.0.0.1", 0)
+        self.loop.run_until_complete(site.start())
+        self.port = site._server.sockets[0].getsockname()[1]
+        self.thread = threading.Thread(target=self.loop.run_forever, daemon=True)
+        self.thread.start()
+
+    def tearDown(self):
+        asyncio.run_coroutine_threadsafe(self.runner.cleanup(), self.loop).result()
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join()
+        self.loop.close()
+
+    async def activities(self, request):
+        page = int(request.query["page"])
+        return web.json_response([ACTIVITY] if page == 1 else [], headers=RATE_LIMIT_HEADERS)
+
+    async def streams(self, request):
+        return web.json_response({"latlng": {"data": [[52.0, 4.0]]}}, headers=RATE_LIMIT_HEADERS)
+
+    def test_usage_from_one_call_throttles_the_next(self):
+        sleeps = []
+
+        async def sleep(delay):
+            sleeps.append(delay)
+
+        # A fixed clock at the start of a window, so the usage is not forgotten
+        scheduler = RateLimitScheduler(clock=lambda: 100 * SHORT_WINDOW, sleep=sleep)
+        client = AsyncFetchClient("token", scheduler=scheduler, base_url=f"http://127.0.0.1:{self.port}",
+                                  concurrency=1, per_page=1)
+
+        self.assertEqual([run.id for run in client.get_activities()], [1])
+        self.assertEqual(scheduler.short_usage, 99)
+        self.assertEqual(sleeps, [SHORT_WINDOW + 1])  # The second page already waited
+
+        client.get_activity_streams(1)
+        self.assertEqual(len(sleeps), 2)
+
+
+class RateLimitSchedulerTest(unittest.TestCase):
+    def test_usage_from_an_earlier_window_is_forgotten(self):
+        now = [100 * SHORT_WINDOW]
+        scheduler = RateLimitScheduler(clock=lambda: now[0])
+        scheduler.update(RATE_LIMIT_HEADERS)
+        now[0] += SHORT_WINDOW
+        asyncio.run(scheduler.acquire())
+        self.assertEqual(scheduler.short_usage, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
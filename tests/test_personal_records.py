@@ -0,0 +1,82 @@
+"""
+Personal-record boards kept incrementally by the activity store must match a
+full rebuild from the stored runs after activities are edited.
+
+    python -m unittest discover tests
+"""
+
+import os
+import sys
+import tempfile
+import unittest
+from datetime import datetime, timedelta, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.activity_store import ActivityStore  # noqa: E402
+from src.personal_records import KINDS, PersonalRecords  # noqa: E402
+from src.run_record import RunRecord  # noqa: E402
+
+CATEGORIES = ("overall", "5K", "10K", "HALF", "MARATHON")
+
+
+def activity(activity_id, distance, activity_type="Run", moving_time=None):
+    return RunRecord(
+        id=activity_id,
+        name=f"Activity {activity_id}",
+        type=activity_type,
+        distance=float(distance),
+        moving_time=moving_time or int(distance * 0.3),
+        start_date=datetime(2024, 1, 1, tzinfo=timezone.utc) + timedelta(days=activity_id),
+    )
+
+
+class PersonalRecordsTest(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.store = ActivityStore(os.path.join(self.tmpdir.name, "activities.db"))
+
+    def tearDown(self):
+        self.store.close()
+        self.tmpdir.cleanup()
+
+    def add(self, *activities):
+        self.store.add_activities(activities)
+        self.store.conn.commit()
+
+    def assertBoardsMatchRebuild(self):
+        rebuilt = PersonalRecords(self.store.conn)
+        rebuilt.rebuild()
+        for category in CATEGORIES:
+            for kind in KINDS:
+                self.assertEqual(self.store.records.records(category, kind),
+                                 rebuilt.records(category, kind), (category, kind))
+
+    def test_run_retyped_leaves_the_boards(self):
+        self.add(activity(1, 80000), *(activity(i, 10000 + i * 1000) for i in range(2, 7)))
+        self.assertEqual(self.store.records.records("overall", "longest")[0][0], 1)
+
+        self.add(activity(1, 80000, "Ride"))
+
+        longest = self.store.records.records("overall", "longest")
+        self.assertNotIn(1, [activity_id for activity_id, _ in longest])
+        self.assertEqual(len(longest), 3)
+        self.assertBoardsMatchRebuild()
+
+        # The corrected boards are what was saved, not just what is in memory
+        self.store.close()
+        self.store = ActivityStore(os.path.join(self.tmpdir.name, "activities.db"))
+        self.assertBoardsMatchRebuild()
+
+    def test_edited_run_lets_an_evicted_run_back(self):
+        self.add(*(activity(i, 10000 + i * 1000) for i in range(1, 5)))
+
+        self.add(activity(4, 3000))
+
+        self.assertEqual([activity_id for activity_id, _ in self.store.records.records("overall", "longest")],
+                         [3, 2, 1])
+        self.assertBoardsMatchRebuild()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,47 @@
+"""
+Start-up checks for the CLI: importing src.main (and running --help) must not
+pull in the heavy dependencies, which load inside the stage that needs them.
+
+    python -m unittest discover tests
+"""
+
+import os
+import subprocess
+import sys
+import unittest
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Modules only the fetching, rendering and storage stages may import
+HEAVY_MODULES = ("stravalib", "PIL", "sqlite3", "dotenv", "aiohttp")
+
+REPORT_MODULES = "import sys\nprint('MODULES', *sorted({name.split('.')[0] for name in sys.modules}))"
+
+
+def loaded_modules(code):
+    """Top-level modules loaded after running code in a fresh interpreter."""
+    result = subprocess.run([sys.executable, "-c", f"{code}\n{REPORT_MODULES}"], cwd=REPO_ROOT,
+                            check=True, capture_output=True, text=True)
+    return set(result.stdout.rsplit("MODULES", 1)[1].split())
+
+
+class StartupTest(unittest.TestCase):
+    def test_import_main_skips_heavy_dependencies(self):
+        loaded = loaded_modules("import src.main")
+        self.assertEqual(sorted(loaded.intersection(HEAVY_MODULES)), [])
+
+    def test_help_skips_heavy_dependencies(self):
+        loaded = loaded_modules(
+            "import sys\n"
+            "sys.argv = ['rundown', '--help']\n"
+            "import src.main\n"
+            "try:\n"
+            "    src.main.main()\n"
+            "except SystemExit:\n"
+            "    pass"
+        )
+        self.assertEqual(sorted(loaded.intersection(HEAVY_MODULES)), [])
+
+
+if __name__ == "__main__":
+    unittest.main()